@@ -0,0 +1,410 @@
+"""Rollup tables for the /analytics endpoints.
+
+Triggers on students, semester_cgpa and placement_drives append +1/-1 deltas
+so the endpoints read a handful of bucket rows instead of scanning students.
+The triggers never touch the shared rollup rows themselves: a bulk import
+would otherwise hold a lock on the "Python" row until it commits, and two
+writers locking skills in different orders deadlock. `fold_rollup_deltas`
+periodically sums the deltas into the rollups in key order, and the
+`*_current` views add whatever hasn't been folded yet, so reads stay exact.
+`rebuild_rollups` recomputes everything from scratch and reports any drift.
+
+    python analytics.py           # rebuild
+    python analytics.py --check   # only report mismatches
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import asyncpg
+from dotenv import load_dotenv
+
+# CGPA buckets are 0.5 wide: bucket 15 covers [7.5, 8.0), bucket 20 is 10.0
+CGPA_BUCKET_WIDTH = 0.5
+
+# Bands used for placement rate by CGPA, as (label, min inclusive, max exclusive)
+CGPA_BANDS = [
+    ("<6", 0.0, 6.0),
+    ("6-7", 6.0, 7.0),
+    ("7-8", 7.0, 8.0),
+    ("8-9", 8.0, 9.0),
+    ("9+", 9.0, 10.5),
+]
+
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup_cgpa_buckets (
+        bucket SMALLINT PRIMARY KEY,
+        students INTEGER NOT NULL DEFAULT 0,
+        placed INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS rollup_skills (
+        skill TEXT PRIMARY KEY,
+        students INTEGER NOT NULL DEFAULT 0,
+        placed INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS rollup_company_months (
+        company TEXT NOT NULL,
+        month DATE NOT NULL,
+        status TEXT NOT NULL,
+        drives INTEGER NOT NULL DEFAULT 0,
+        packaged INTEGER NOT NULL DEFAULT 0,
+        package_sum BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (company, month, status)
+    );
+
+    -- Append-only, folded into the tables above by fold_rollup_deltas
+    CREATE TABLE IF NOT EXISTS rollup_cgpa_bucket_deltas (
+        bucket SMALLINT NOT NULL,
+        students INTEGER NOT NULL,
+        placed INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS rollup_skill_deltas (
+        skill TEXT NOT NULL,
+        students INTEGER NOT NULL,
+        placed INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS rollup_company_month_deltas (
+        company TEXT NOT NULL,
+        month DATE NOT NULL,
+        status TEXT NOT NULL,
+        drives INTEGER NOT NULL,
+        packaged INTEGER NOT NULL,
+        package_sum BIGINT NOT NULL
+    );
+
+    CREATE OR REPLACE VIEW rollup_cgpa_buckets_current AS
+    SELECT bucket, SUM(students)::int AS students, SUM(placed)::int AS placed
+    FROM (
+        SELECT bucket, students, placed FROM rollup_cgpa_buckets
+        UNION ALL
+        SELECT bucket, students, placed FROM rollup_cgpa_bucket_deltas
+    ) AS t
+    GROUP BY bucket;
+
+    CREATE OR REPLACE VIEW rollup_skills_current AS
+    SELECT skill, SUM(students)::int AS students, SUM(placed)::int AS placed
+    FROM (
+        SELECT skill, students, placed FROM rollup_skills
+        UNION ALL
+        SELECT skill, students, placed FROM rollup_skill_deltas
+    ) AS t
+    GROUP BY skill;
+
+    CREATE OR REPLACE VIEW rollup_company_months_current AS
+    SELECT company, month, status,
+           SUM(drives)::int AS drives,
+           SUM(packaged)::int AS packaged,
+           SUM(package_sum)::bigint AS package_sum
+    FROM (
+        SELECT company, month, status, drives, packaged, package_sum
+        FROM rollup_company_months
+        UNION ALL
+        SELECT company, month, status, drives, packaged, package_sum
+        FROM rollup_company_month_deltas
+    ) AS t
+    GROUP BY company, month, status;
+
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        built_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+
+    CREATE OR REPLACE FUNCTION cgpa_bucket(cgpa REAL)
+    RETURNS SMALLINT AS $$
+        SELECT LEAST(GREATEST(floor(cgpa * 2)::int, 0), 20)::smallint;
+    $$ LANGUAGE sql IMMUTABLE;
+
+    -- Distinct, trimmed skills out of the JSON text column. Anything that
+    -- isn't a JSON array counts as no skills.
+    CREATE OR REPLACE FUNCTION skill_set(skills TEXT)
+    RETURNS SETOF TEXT AS $$
+        SELECT DISTINCT trim(value)
+        FROM json_array_elements_text(
+            CASE WHEN json_typeof(NULLIF(skills, '')::json) = 'array'
+                 THEN NULLIF(skills, '')::json
+                 ELSE '[]'::json END
+        )
+        WHERE trim(value) <> '';
+    $$ LANGUAGE sql IMMUTABLE;
+
+    -- Undated drives land in a '-infinity' month so they still have a key
+    CREATE OR REPLACE FUNCTION drive_month(start_date TIMESTAMPTZ, end_date TIMESTAMPTZ)
+    RETURNS DATE AS $$
+        SELECT COALESCE(
+            date_trunc('month', COALESCE(start_date, end_date) AT TIME ZONE 'UTC')::date,
+            '-infinity'::date
+        );
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE OR REPLACE FUNCTION rollup_student_delta(
+        cgpa REAL, is_placed BOOLEAN, skills TEXT, delta INTEGER
+    )
+    RETURNS VOID AS $$
+    BEGIN
+        IF cgpa IS NOT NULL THEN
+            INSERT INTO rollup_cgpa_bucket_deltas (bucket, students, placed)
+            VALUES (cgpa_bucket(cgpa), delta, CASE WHEN is_placed THEN delta ELSE 0 END);
+        END IF;
+
+        INSERT INTO rollup_skill_deltas (skill, students, placed)
+        SELECT s, delta, CASE WHEN is_placed THEN delta ELSE 0 END
+        FROM skill_set(skills) AS s;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_students_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM rollup_student_delta(OLD.final_cgpa, OLD.placed, OLD.skills, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM rollup_student_delta(NEW.final_cgpa, NEW.placed, NEW.skills, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_drive_delta(
+        company TEXT, month DATE, status TEXT, package INTEGER, delta INTEGER
+    )
+    RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO rollup_company_month_deltas
+            (company, month, status, drives, packaged, package_sum)
+        VALUES (
+            company, month, COALESCE(status, 'unknown'), delta,
+            CASE WHEN package IS NULL THEN 0 ELSE delta END,
+            COALESCE(package, 0) * delta
+        );
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_drives_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM rollup_drive_delta(
+                OLD.company, drive_month(OLD.start_date, OLD.end_date),
+                OLD.status, OLD.package, -1
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM rollup_drive_delta(
+                NEW.company, drive_month(NEW.start_date, NEW.end_date),
+                NEW.status, NEW.package, 1
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- final_cgpa follows semester_cgpa on every write, which in turn moves
+    -- the student between CGPA buckets through the students trigger
+    CREATE OR REPLACE FUNCTION semester_cgpa_sync_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM update_student_final_cgpa(OLD.student_id);
+        END IF;
+        IF TG_OP = 'INSERT'
+           OR (TG_OP = 'UPDATE' AND NEW.student_id IS DISTINCT FROM OLD.student_id) THEN
+            PERFORM update_student_final_cgpa(NEW.student_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS students_rollup ON students;
+    CREATE TRIGGER students_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF final_cgpa, placed, skills ON students
+    FOR EACH ROW EXECUTE FUNCTION rollup_students_trigger();
+
+    DROP TRIGGER IF EXISTS placement_drives_rollup ON placement_drives;
+    CREATE TRIGGER placement_drives_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF company, status, start_date, end_date, package
+    ON placement_drives
+    FOR EACH ROW EXECUTE FUNCTION rollup_drives_trigger();
+
+    DROP TRIGGER IF EXISTS semester_cgpa_sync ON semester_cgpa;
+    CREATE TRIGGER semester_cgpa_sync
+    AFTER INSERT OR UPDATE OR DELETE ON semester_cgpa
+    FOR EACH ROW EXECUTE FUNCTION semester_cgpa_sync_trigger();
+"""
+
+# Full-scan versions of what the triggers maintain, keyed the same way
+FRESH_QUERIES = {
+    "rollup_cgpa_buckets": (
+        ("bucket",),
+        """
+        SELECT cgpa_bucket(final_cgpa) AS bucket,
+               COUNT(*)::int AS students,
+               (COUNT(*) FILTER (WHERE placed))::int AS placed
+        FROM students WHERE final_cgpa IS NOT NULL
+        GROUP BY 1
+        """,
+    ),
+    "rollup_skills": (
+        ("skill",),
+        """
+        SELECT sk AS skill,
+               COUNT(*)::int AS students,
+               (COUNT(*) FILTER (WHERE st.placed))::int AS placed
+        FROM students st CROSS JOIN LATERAL skill_set(st.skills) AS sk
+        GROUP BY 1
+        """,
+    ),
+    "rollup_company_months": (
+        ("company", "month", "status"),
+        """
+        SELECT company,
+               drive_month(start_date, end_date) AS month,
+               COALESCE(status, 'unknown') AS status,
+               COUNT(*)::int AS drives,
+               COUNT(package)::int AS packaged,
+               COALESCE(SUM(package), 0)::bigint AS package_sum
+        FROM placement_drives
+        GROUP BY 1, 2, 3
+        """,
+    ),
+}
+
+
+# Rollup table -> (delta table its triggers append to, summed columns)
+ROLLUP_DELTAS = {
+    "rollup_cgpa_buckets": ("rollup_cgpa_bucket_deltas", ("students", "placed")),
+    "rollup_skills": ("rollup_skill_deltas", ("students", "placed")),
+    "rollup_company_months": (
+        "rollup_company_month_deltas",
+        ("drives", "packaged", "package_sum"),
+    ),
+}
+
+# Arbitrary but fixed, so only one process folds at a time
+ROLLUP_FOLD_LOCK_KEY = 7261031
+
+
+def _fold_query(table: str, key_columns: tuple) -> str:
+    delta_table, value_columns = ROLLUP_DELTAS[table]
+    keys = ", ".join(key_columns)
+    values = ", ".join(value_columns)
+    sums = ", ".join(f"SUM({c})" for c in value_columns)
+    updates = ", ".join(f"{c} = r.{c} + excluded.{c}" for c in value_columns)
+    return f"""
+        WITH moved AS (DELETE FROM {delta_table} RETURNING {keys}, {values})
+        INSERT INTO {table} AS r ({keys}, {values})
+        SELECT {keys}, {sums} FROM moved GROUP BY {keys} ORDER BY {keys}
+        ON CONFLICT ({keys}) DO UPDATE SET {updates}
+    """
+
+
+async def fold_rollup_deltas(conn) -> bool:
+    """Sum pending deltas into the rollup tables; False if another fold is running.
+
+    A single folder applies each table's deltas in key order, so folds
+    can't deadlock and writers never wait on a rollup row.
+    """
+    async with conn.transaction():
+        if not await conn.fetchval(
+            "SELECT pg_try_advisory_xact_lock($1)", ROLLUP_FOLD_LOCK_KEY
+        ):
+            return False
+        for table, (key_columns, _) in FRESH_QUERIES.items():
+            await conn.execute(_fold_query(table, key_columns))
+    return True
+
+
+def _index_rows(rows, key_columns):
+    """Key rows by their primary key, ignoring all-zero rows left by deltas."""
+    indexed = {}
+    for row in rows:
+        row = dict(row)
+        values = {k: v for k, v in row.items() if k not in key_columns}
+        if not any(values.values()):
+            continue
+        indexed[tuple(str(row[k]) for k in key_columns)] = values
+    return indexed
+
+
+async def rebuild_rollups(conn, apply: bool = True):
+    """Recompute every rollup from the base tables and diff against what's stored.
+
+    Writers to students/placement_drives are blocked for the duration so no
+    trigger delta can slip in between the scan and the swap.
+    """
+    async with conn.transaction():
+        # Same order writers take them in: base tables before the delta
+        # tables their triggers append to, and semester_cgpa before students
+        # since its trigger updates students. Locking the rollups first
+        # deadlocks against any write already in flight.
+        await conn.execute(
+            "LOCK TABLE semester_cgpa, students, placement_drives IN SHARE MODE"
+        )
+        await conn.execute(
+            """LOCK TABLE rollup_state, rollup_cgpa_buckets, rollup_skills,
+               rollup_company_months, rollup_cgpa_bucket_deltas, rollup_skill_deltas,
+               rollup_company_month_deltas IN ACCESS EXCLUSIVE MODE"""
+        )
+
+        mismatches = {}
+        for table, (key_columns, query) in FRESH_QUERIES.items():
+            fresh_rows = await conn.fetch(query)
+            stored = _index_rows(
+                await conn.fetch(f"SELECT * FROM {table}_current"), key_columns
+            )
+            fresh = _index_rows(fresh_rows, key_columns)
+
+            diffs = []
+            for key in sorted(set(stored) | set(fresh)):
+                if stored.get(key) != fresh.get(key):
+                    diffs.append(
+                        {
+                            "key": list(key),
+                            "stored": stored.get(key),
+                            "expected": fresh.get(key),
+                        }
+                    )
+            if diffs:
+                mismatches[table] = diffs
+
+            if apply:
+                await conn.execute(f"DELETE FROM {ROLLUP_DELTAS[table][0]}")
+                await conn.execute(f"DELETE FROM {table}")
+                if fresh_rows:
+                    columns = list(fresh_rows[0].keys())
+                    await conn.copy_records_to_table(
+                        table,
+                        records=[tuple(r) for r in fresh_rows],
+                        columns=columns,
+                    )
+
+        if apply:
+            await conn.execute(
+                """INSERT INTO rollup_state (id, built_at) VALUES (TRUE, NOW())
+                   ON CONFLICT (id) DO UPDATE SET built_at = NOW()"""
+            )
+
+    return {"consistent": not mismatches, "applied": apply, "mismatches": mismatches}
+
+
+async def _main(argv):
+    load_dotenv()
+    check_only = "--check" in argv
+    conn = await asyncpg.connect(dsn=os.getenv("DB_URL"))
+    try:
+        result = await rebuild_rollups(conn, apply=not check_only)
+    finally:
+        await conn.close()
+
+    print(json.dumps(result, indent=2, default=str))
+    return 0 if result["consistent"] or not check_only else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,120 @@
+"""Resume parsing throughput on a synthetic corpus, serial vs process pool.
+
+Generates a mix of text and DOCX resumes in memory (no database, no files
+on disk) and runs the same parse_resume the worker uses.
+
+    python benchmarks/resume_parsing.py --resumes 2000 --workers 8
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resume_parser import SKILL_ALIASES, parse_resume  # noqa: E402
+
+FIRST_NAMES = ["Aarav", "Riya", "Vikram", "Priya", "Rahul", "Ananya", "Kabir", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Rao", "Menon", "Iyer", "Gupta", "Singh", "Nair"]
+ROLES = ["Backend", "Frontend", "AI", "Data", "Research", "SDE", "Mobile", "Full Stack"]
+COMPANIES = ["Acme Labs", "Zeta Systems", "Nimbus", "Orbit AI", "Quanta", "Helix"]
+FILLER = (
+    "Worked closely with the team to ship features on time and improve "
+    "reliability across services while keeping the codebase maintainable. "
+)
+
+
+def synthetic_resume(rng: random.Random) -> str:
+    skills = rng.sample(list(SKILL_ALIASES), rng.randint(3, 10))
+    lines = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "Skills: " + ", ".join(skills),
+        "",
+        "Experience",
+    ]
+    for _ in range(rng.randint(1, 3)):
+        lines.append(f"- {rng.choice(ROLES)} Intern at {rng.choice(COMPANIES)}")
+        lines.append(FILLER * rng.randint(1, 6))
+    lines.append("Projects")
+    for _ in range(rng.randint(1, 4)):
+        lines.append(f"Built a tool with {rng.choice(skills)}. " + FILLER * rng.randint(1, 4))
+    return "\n".join(lines)
+
+
+def to_docx(text: str) -> bytes:
+    paragraphs = "".join(
+        f"<w:p><w:r><w:t>{escape(line)}</w:t></w:r></w:p>" for line in text.splitlines()
+    )
+    document = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{paragraphs}</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def build_corpus(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        text = synthetic_resume(rng)
+        if i % 2:
+            corpus.append((to_docx(text), f"resume_{i}.docx"))
+        else:
+            corpus.append((text.encode(), f"resume_{i}.txt"))
+    return corpus
+
+
+def run_serial(corpus):
+    return [parse_resume(content, name) for content, name in corpus]
+
+
+def run_pool(executor, corpus):
+    contents = [c for c, _ in corpus]
+    names = [n for _, n in corpus]
+    return list(executor.map(parse_resume, contents, names, chunksize=16))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.resumes, args.seed)
+    size_mb = sum(len(c) for c, _ in corpus) / 1024 / 1024
+    print(f"corpus: {len(corpus)} resumes, {size_mb:.1f}MB")
+
+    start = time.perf_counter()
+    serial = run_serial(corpus)
+    serial_time = time.perf_counter() - start
+    print(f"serial:          {len(corpus) / serial_time:8.0f} resumes/s")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Process startup is a one-off cost for the long-running worker, keep it out
+        run_pool(executor, corpus[: args.workers * 16])
+        start = time.perf_counter()
+        pooled = run_pool(executor, corpus)
+        pool_time = time.perf_counter() - start
+    print(
+        f"pool ({args.workers:>2} procs): {len(corpus) / pool_time:8.0f} resumes/s "
+        f"({serial_time / pool_time:.2f}x)"
+    )
+
+    assert serial == pooled
+    skills = sum(len(r["skills"]) for r in serial) / len(serial)
+    internships = sum(len(r["internships"]) for r in serial) / len(serial)
+    print(f"avg extracted: {skills:.1f} skills, {internships:.1f} internships per resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Throughput of serve.py as the worker count goes from 1 to N.
+
+Starts the launcher for each worker count, hammers one endpoint with
+keep-alive connections for a fixed duration and prints requests/second.
+Needs a reachable DB_URL unless --path points at something that doesn't
+touch the database (e.g. /).
+
+    python benchmarks/serving.py --max-workers 8 --path "/students?limit=20"
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def client(host, port, path, deadline, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    try:
+        while time.monotonic() < deadline:
+            writer.write(request)
+            await writer.drain()
+
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+
+            if headers.startswith(b"HTTP/1.1 200"):
+                counts["ok"] += 1
+            else:
+                counts["error"] += 1
+    finally:
+        writer.close()
+
+
+async def load(host, port, path, concurrency, duration):
+    counts = {"ok": 0, "error": 0}
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(client(host, port, path, deadline, counts) for _ in range(concurrency))
+    )
+    return counts
+
+
+async def wait_until_up(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on {port} did not come up")
+
+
+def run(workers, args):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "serve.py",
+            "--workers",
+            str(workers),
+            "--port",
+            str(args.port),
+            "--pool-budget",
+            str(args.pool_budget),
+        ],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(wait_until_up("127.0.0.1", args.port))
+        # Warm up pools and caches before measuring
+        asyncio.run(load("127.0.0.1", args.port, args.path, args.concurrency, 1))
+        counts = asyncio.run(
+            load("127.0.0.1", args.port, args.path, args.concurrency, args.duration)
+        )
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="/students?limit=20")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--pool-budget", type=int, default=80)
+    args = parser.parse_args()
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'errors':>8} {'scaling':>8}")
+    for workers in counts:
+        result = run(workers, args)
+        rps = result["ok"] / args.duration
+        baseline = baseline or rps
+        scaling = rps / baseline if baseline else 0
+        print(f"{workers:>8} {rps:>10.0f} {result['error']:>8} {scaling:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
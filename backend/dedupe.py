@@ -0,0 +1,233 @@
+"""Duplicate student detection.
+
+Comparing every pair of students is O(N^2), so records are first grouped
+into blocks that share a cheap key (Soundex of the name, the normalized
+phone, the email local part, the name's sorted tokens). Only pairs inside
+a block get scored, and each block is scored at once with hashed character
+trigram vectors and a matrix product. Each record lands in at most four
+blocks and oversized blocks are skipped, which keeps a run near-linear.
+
+Scans either cover the whole table or one import batch, where only pairs
+that involve a batch record are scored. Scoring runs in a separate process
+so it doesn't hold the GIL the server's event loop needs, and only one full
+scan runs at a time across all workers.
+"""
+
+import asyncio
+import json
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TRIGRAM_DIMS = 256
+# Blocks bigger than this are usually a common surname, and scoring them
+# would bring back the quadratic blow-up blocking is meant to avoid
+MAX_BLOCK_SIZE = 500
+DUPLICATE_THRESHOLD = 0.85
+# Arbitrary but fixed, held for the length of a full scan
+FULL_SCAN_LOCK_KEY = 7261030
+
+# Feature weights; phone only counts when both records have one
+NAME_WEIGHT = 0.5
+EMAIL_WEIGHT = 0.3
+PHONE_WEIGHT = 0.2
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(word: str) -> str:
+    word = "".join(c for c in word.lower() if c.isalpha())
+    if not word:
+        return ""
+
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0], "")
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w don't separate letters with the same code, vowels do
+        if c not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def normalize_name(name) -> list:
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.findall(r"[a-z]+", text)
+
+
+def normalize_email(email) -> str:
+    """Local part only, lowercased, without +tags or punctuation."""
+    email = str(email or "").strip().lower()
+    local = email.split("@", 1)[0]
+    local = local.split("+", 1)[0]
+    return re.sub(r"[^a-z0-9]", "", local)
+
+
+def normalize_phone(phone) -> str:
+    """Last 10 digits, so +91 / 0 prefixes and separators don't matter."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
+def normalize_record(row) -> dict:
+    tokens = normalize_name(row["name"])
+    return {
+        "id": row["id"],
+        "tokens": tokens,
+        "name": " ".join(tokens),
+        "email": normalize_email(row["email"]),
+        "phone": normalize_phone(row["phone"]),
+    }
+
+
+def blocking_keys(record: dict) -> set:
+    keys = set()
+    tokens = record["tokens"]
+    if tokens:
+        keys.add(("soundex", soundex(tokens[0]) + soundex(tokens[-1])))
+        keys.add(("name", " ".join(sorted(tokens))))
+    if record["phone"]:
+        keys.add(("phone", record["phone"]))
+    if len(record["email"]) >= 4:
+        keys.add(("email", record["email"]))
+    return keys
+
+
+def trigram_matrix(strings: list) -> np.ndarray:
+    """Rows of L2-normalized hashed trigram counts, so X @ X.T is cosine similarity."""
+    matrix = np.zeros((len(strings), TRIGRAM_DIMS), dtype=np.float32)
+    for row, text in enumerate(strings):
+        padded = f"  {text} "
+        for i in range(len(padded) - 2):
+            matrix[row, zlib.crc32(padded[i : i + 3].encode()) % TRIGRAM_DIMS] += 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def score_block(records: list, members: list, focus: list) -> dict:
+    """Score every (focus, member) pair in one block with a few matrix products.
+
+    Returns {(low_id, high_id): (score, reasons)} for pairs above threshold.
+    """
+    block = [records[i] for i in members]
+    names = trigram_matrix([r["name"] for r in block])
+    emails = trigram_matrix([r["email"] for r in block])
+    phones = np.array([r["phone"] for r in block], dtype=object)
+
+    position = {index: p for p, index in enumerate(members)}
+    rows = [position[i] for i in focus]
+    name_sim = names[rows] @ names.T
+    email_sim = emails[rows] @ emails.T
+    has_phone = phones != ""
+    phone_both = has_phone[rows][:, None] & has_phone[None, :]
+    phone_same = (phones[rows][:, None] == phones[None, :]) & phone_both
+
+    weight = NAME_WEIGHT + EMAIL_WEIGHT + PHONE_WEIGHT * phone_both
+    score = (
+        NAME_WEIGHT * name_sim + EMAIL_WEIGHT * email_sim + PHONE_WEIGHT * phone_same
+    ) / weight
+
+    found = {}
+    for r, c in zip(*np.nonzero(score >= DUPLICATE_THRESHOLD)):
+        a, b = block[rows[r]], block[c]
+        if a["id"] == b["id"]:
+            continue
+        reasons = [f"name {name_sim[r, c]:.2f}", f"email {email_sim[r, c]:.2f}"]
+        if phone_same[r, c]:
+            reasons.append("same phone")
+        found[(min(a["id"], b["id"]), max(a["id"], b["id"]))] = (
+            float(score[r, c]),
+            reasons,
+        )
+    return found
+
+
+def find_duplicates(rows: list, batch_ids=None) -> list:
+    """Return [(student_id, duplicate_of, score, reasons)] with student_id > duplicate_of."""
+    records = [normalize_record(row) for row in rows]
+    batch = set(batch_ids) if batch_ids is not None else None
+
+    blocks = defaultdict(list)
+    for index, record in enumerate(records):
+        for key in blocking_keys(record):
+            blocks[key].append(index)
+
+    pairs = {}
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        if batch is None:
+            focus = members
+        else:
+            focus = [i for i in members if records[i]["id"] in batch]
+            if not focus:
+                continue
+
+        for pair, (score, reasons) in score_block(records, members, focus).items():
+            if pair not in pairs or score > pairs[pair][0]:
+                pairs[pair] = (score, reasons)
+
+    return [(high, low, score, reasons) for (low, high), (score, reasons) in pairs.items()]
+
+
+_executor = None
+
+
+def _scan_executor() -> ProcessPoolExecutor:
+    # Created on first use, so pre-forked server workers each start their own
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    return _executor
+
+
+async def scan_duplicates(conn, batch_ids=None):
+    """Score duplicates and upsert them into duplicate_suggestions.
+
+    Returns the number of suggestions, or None for a full scan skipped
+    because another one is already running. Suggestions an admin already
+    dismissed stay dismissed.
+    """
+    full_scan = batch_ids is None
+    if full_scan and not await conn.fetchval(
+        "SELECT pg_try_advisory_lock($1)", FULL_SCAN_LOCK_KEY
+    ):
+        return None
+
+    try:
+        rows = await conn.fetch("SELECT id, name, email, phone FROM students")
+        # Plain dicts, asyncpg Records don't pickle
+        rows = [dict(row) for row in rows]
+        suggestions = await asyncio.get_running_loop().run_in_executor(
+            _scan_executor(), find_duplicates, rows, batch_ids
+        )
+
+        await conn.executemany(
+            """INSERT INTO duplicate_suggestions (student_id, duplicate_of, score, reasons)
+               VALUES ($1, $2, $3, $4)
+               ON CONFLICT (student_id, duplicate_of) DO UPDATE SET
+                   score=excluded.score, reasons=excluded.reasons
+               WHERE duplicate_suggestions.status = 'open'""",
+            [(a, b, score, json.dumps(reasons)) for a, b, score, reasons in suggestions],
+        )
+    finally:
+        if full_scan:
+            await conn.execute("SELECT pg_advisory_unlock($1)", FULL_SCAN_LOCK_KEY)
+    return len(suggestions)
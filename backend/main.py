@@ -4,7 +4,8 @@ import json
 import logging
 import os
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 
 import asyncpg
@@ -22,11 +23,16 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, ValidationError, validator
 
+from analytics import CGPA_BANDS, CGPA_BUCKET_WIDTH, fold_rollup_deltas, rebuild_rollups
+from dedupe import scan_duplicates
+from migrations import LATEST_VERSION, current_version, migrate
+
 load_dotenv()
 
 # JWT Configuration
@@ -56,95 +62,256 @@ app.add_middleware(
 )
 
 pool: Optional[asyncpg.Pool] = None
+rollup_folder: Optional[asyncio.Task] = None
 
 
 @app.on_event("startup")
 async def startup():
-    global pool
-    pool = await asyncpg.create_pool(dsn=os.getenv("DB_URL"))
+    global pool, rollup_folder
+    # serve.py splits a global connection budget across workers through these
+    max_size = int(os.getenv("DB_POOL_MAX", "10"))
+    min_size = min(int(os.getenv("DB_POOL_MIN", "10")), max_size)
+    pool = await asyncpg.create_pool(
+        dsn=os.getenv("DB_URL"), min_size=min_size, max_size=max_size
+    )
     if pool is None:
         logger.error("Failed to create connection pool.")
         return
 
+    # Schema changes live in migrations.py. When the schema is already
+    # current this is a single version lookup; set MIGRATE_ON_STARTUP=false
+    # to run `python migrations.py` as a separate deploy step instead.
     async with pool.acquire() as conn:
-        # Create users table first
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                role VARCHAR(50) DEFAULT 'user',
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-
-        # Create students table
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER UNIQUE REFERENCES users(id) ON DELETE CASCADE,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                final_cgpa REAL,
-                skills TEXT,
-                internships TEXT,
-                projects TEXT,
-                placed BOOLEAN DEFAULT FALSE,
-                bio TEXT,
-                created TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-
-        # Create semester_cgpa table
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS semester_cgpa (
-                id SERIAL PRIMARY KEY,
-                student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
-                semester TEXT NOT NULL,
-                cgpa REAL NOT NULL,
-                UNIQUE (student_id, semester)
-            )
-        """)
-
-        # Create placement_drives table
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS placement_drives (
-                id SERIAL PRIMARY KEY,
-                company TEXT NOT NULL,
-                status TEXT CHECK (status IN ('ongoing', 'completed', 'starting_soon')) DEFAULT 'starting_soon',
-                start_date TIMESTAMPTZ,
-                end_date TIMESTAMPTZ,
-                package INTEGER,
-                description TEXT
-            )
-        """)
+        if os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true":
+            await migrate(conn)
+        elif await current_version(conn) < LATEST_VERSION:
+            logger.warning("Schema is behind, run `python migrations.py`")
 
-        # Create function to update final_cgpa
-        await conn.execute("""
-            CREATE OR REPLACE FUNCTION update_student_final_cgpa(student_id_param INTEGER)
-            RETURNS VOID AS $$
-            DECLARE
-                avg_cgpa REAL;
-            BEGIN
-                SELECT AVG(cgpa) INTO avg_cgpa
-                FROM semester_cgpa
-                WHERE student_id = student_id_param;
-
-                UPDATE students
-                SET final_cgpa = avg_cgpa
-                WHERE id = student_id_param;
-            END;
-            $$ LANGUAGE plpgsql;
-        """)
+    await placement_feed.start(os.getenv("DB_URL"))
+    rollup_folder = asyncio.create_task(fold_rollups_periodically())
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    if rollup_folder:
+        rollup_folder.cancel()
+    await placement_feed.stop()
     if pool:
         await pool.close()
 
 
+# Placement change feed
+FEED_CHANNEL = "placement_changes"
+FEED_BUFFER_SIZE = 1000
+FEED_QUEUE_SIZE = 100
+FEED_HEARTBEAT_SECONDS = 15
+FEED_RECONNECT_SECONDS = 5
+
+
+class PlacementFeed:
+    """One LISTEN connection per worker, fanned out to any number of SSE clients.
+
+    Recent events are kept in a ring buffer so a reconnecting client can
+    resume from its Last-Event-ID. A client whose queue fills up is cut off
+    rather than allowed to hold events in memory; it reconnects and replays
+    from the buffer.
+    """
+
+    def __init__(self):
+        self.conn: Optional[asyncpg.Connection] = None
+        self.buffer = deque(maxlen=FEED_BUFFER_SIZE)
+        self.subscribers = set()
+        self._dsn: Optional[str] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def start(self, dsn: str):
+        self._dsn = dsn
+        await self._connect()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+        if self.conn and not self.conn.is_closed():
+            await self.conn.close()
+        for queue in list(self.subscribers):
+            self._disconnect(queue)
+
+    async def _connect(self):
+        try:
+            self.conn = await asyncpg.connect(dsn=self._dsn)
+            await self.conn.add_listener(FEED_CHANNEL, self._on_notify)
+            logger.info(f"Listening on {FEED_CHANNEL}")
+        except Exception as e:
+            self.conn = None
+            logger.error(f"Placement feed listener failed to connect: {e}")
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(FEED_RECONNECT_SECONDS)
+            if self.conn is None or self.conn.is_closed():
+                await self._connect()
+                if self.conn is not None:
+                    # Anything sent while we were down is lost, tell clients to refetch
+                    self.buffer.clear()
+                    self._publish({"event_id": None, "op": "reset"})
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.error(f"Bad payload on {channel}: {payload}")
+            return
+        self.buffer.append(event)
+        read_cache.invalidate(
+            "placements" if event.get("table") == "placement_drives" else "students"
+        )
+        self._publish(event)
+
+    def _publish(self, event: dict):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("SSE client too slow, disconnecting")
+                self._disconnect(queue)
+
+    def _disconnect(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        # Drop whatever is pending and leave a sentinel so the stream closes
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+
+        if last_event_id is not None:
+            # Ids are assigned before commit, so they can arrive out of order.
+            # Replay by position in the buffer rather than by comparing ids.
+            events = list(self.buffer)
+            position = next(
+                (i for i, e in enumerate(events) if e["event_id"] == last_event_id),
+                None,
+            )
+            missed = events[position + 1 :] if position is not None else None
+            if missed is None or len(missed) > FEED_QUEUE_SIZE:
+                # Client missed more than we can replay, it has to refetch
+                queue.put_nowait({"event_id": None, "op": "reset"})
+            else:
+                for event in missed:
+                    queue.put_nowait(event)
+
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+
+placement_feed = PlacementFeed()
+
+
+def format_sse(event: dict) -> str:
+    lines = []
+    if event.get("event_id") is not None:
+        lines.append(f"id: {event['event_id']}")
+    lines.append(f"event: {event['op']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# Read coalescing
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "2"))
+READ_CACHE_MAX_ENTRIES = 1024
+
+
+class ReadCoalescer:
+    """Single-flight plus a short TTL cache for hot anonymous reads.
+
+    Identical concurrent requests share one in-flight query, and the result
+    is kept for READ_CACHE_TTL seconds. Each entry is keyed on the version
+    of the scopes it reads ("students", "placements"); writes bump those
+    versions so stale entries are never served again by this worker.
+    Other workers fall back to the TTL, except for placement changes which
+    arrive through the feed.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.versions = {"students": 0, "placements": 0}
+        self.counters = {"requests": 0, "hits": 0, "coalesced": 0, "loads": 0}
+
+    def invalidate(self, *scopes: str):
+        for scope in scopes:
+            self.versions[scope] += 1
+
+    async def get(self, key: tuple, scopes: tuple, load):
+        self.counters["requests"] += 1
+        versions = tuple(self.versions[s] for s in scopes)
+        key = (key, versions)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return value
+            del self.entries[key]
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            # shield so one client disconnecting doesn't cancel everyone's query
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader's client went away mid-query, run it ourselves
+                return await load()
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        self.counters["loads"] += 1
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved so a future nobody joined doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+        future.set_result(value)
+        if tuple(self.versions[s] for s in scopes) == versions:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def metrics(self) -> dict:
+        requests = self.counters["requests"]
+        saved = self.counters["hits"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "entries": len(self.entries),
+            "inflight": len(self.inflight),
+            "coalescing_ratio": round(saved / requests, 3) if requests else 0,
+        }
+
+
+read_cache = ReadCoalescer(READ_CACHE_TTL, READ_CACHE_MAX_ENTRIES)
+
+
 # Models
 class Project(BaseModel):
     title: str
@@ -164,6 +331,26 @@ class Student(BaseModel):
     bio: Optional[str] = None
 
 
+class StudentPatch(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    skills: Optional[List[str]] = None
+    internships: Optional[List[str]] = None
+    placed: Optional[bool] = None
+    projects: Optional[List[Project]] = None
+    bio: Optional[str] = None
+
+    # Leaving these out keeps the current value; an explicit null would
+    # violate NOT NULL on students
+    # No `field` argument, pydantic v2 only accepts (cls, value) here
+    @validator("name", "email", pre=True)
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("cannot be null")
+        return value
+
+
 class UserCreate(BaseModel):
     email: str
     password: str
@@ -202,6 +389,78 @@ class SemesterCGPA(BaseModel):
     cgpa: float
 
 
+# Field projection
+# Whitelists double as the only column names that ever get interpolated into SQL
+STUDENT_FIELDS = (
+    "id",
+    "user_id",
+    "name",
+    "email",
+    "phone",
+    "final_cgpa",
+    "skills",
+    "internships",
+    "projects",
+    "placed",
+    "bio",
+    "created",
+)
+STUDENT_SUMMARY_FIELDS = (
+    "id",
+    "name",
+    "email",
+    "final_cgpa",
+    "skills",
+    "internships",
+    "placed",
+)
+STUDENT_JSON_FIELDS = ("skills", "internships", "projects")
+
+PLACEMENT_FIELDS = (
+    "id",
+    "company",
+    "status",
+    "start_date",
+    "end_date",
+    "package",
+    "description",
+)
+
+
+def parse_fields(fields: Optional[str], allowed: tuple, default: tuple) -> List[str]:
+    """Turn a `fields=` query param into a validated column list.
+
+    `None` gives the default view, `all` gives every column. `id` is always
+    included since cursors and detail links depend on it.
+    """
+    if fields is None:
+        return list(default)
+    if fields.strip() == "all":
+        return list(allowed)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+
+    columns = ["id"]
+    for f in requested:
+        if f not in columns:
+            columns.append(f)
+    return columns
+
+
+def decode_student(row) -> dict:
+    student = dict(row)
+    for key in STUDENT_JSON_FIELDS:
+        if key in student:
+            student[key] = json.loads(student[key] or "[]")
+    return student
+
+
 # Auth utilities
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -218,9 +477,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(
+async def get_conn():
+    """One pool connection per request, shared by auth and the handler.
+
+    FastAPI caches dependencies within a request, so everything that
+    depends on this gets the same connection.
+    """
+    async with pool.acquire() as conn:
+        yield conn
+
+
+async def get_token_email(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-):
+) -> str:
+    """Check the JWT without the database, so bad tokens never take a connection."""
     try:
         payload = jwt.decode(
             credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM]
@@ -230,25 +500,23 @@ async def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return email
 
-    async with pool.acquire() as conn:
-        user = await conn.fetchrow(
-            "SELECT id, email, role FROM users WHERE email = $1", email
-        )
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
 
-        # Get student_id if exists
-        student = await conn.fetchrow(
-            "SELECT id FROM students WHERE user_id = $1", user["id"]
-        )
+async def get_current_user(
+    email: str = Depends(get_token_email),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    user = await conn.fetchrow(
+        """SELECT u.id, u.email, u.role, s.id AS student_id
+           FROM users u LEFT JOIN students s ON s.user_id = u.id
+           WHERE u.email = $1""",
+        email,
+    )
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
 
-        return {
-            "id": user["id"],
-            "email": user["email"],
-            "role": user["role"],
-            "student_id": student["id"] if student else None,
-        }
+    return dict(user)
 
 
 async def require_admin(current_user: dict = Depends(get_current_user)):
@@ -257,6 +525,23 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
+def is_admin(current_user: dict) -> bool:
+    return current_user["role"] == "admin"
+
+
+async def raise_student_write_miss(conn, student_id: int):
+    """Explain why a guarded student write touched no rows.
+
+    Only runs on the failure path, the happy path stays one statement.
+    """
+    exists = await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM students WHERE id=$1)", student_id
+    )
+    if not exists:
+        raise HTTPException(status_code=404, detail="Student not found")
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+
 # Response time logger
 @app.middleware("http")
 async def response_time_logger(request: Request, call_next):
@@ -305,6 +590,7 @@ async def register(user: UserCreate):
             json.dumps([]),
             json.dumps([]),
         )
+        read_cache.invalidate("students")
 
         # Create token
         access_token = create_access_token(
@@ -347,30 +633,32 @@ async def logout():
 # Admin routes
 @app.post("/admin/make-admin")
 async def make_admin(
-    email: str = Body(..., embed=True), _: dict = Depends(require_admin)
+    email: str = Body(..., embed=True),
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        result = await conn.fetchrow(
-            "UPDATE users SET role='admin' WHERE email=$1 RETURNING id, email, role",
-            email,
-        )
-        if not result:
-            raise HTTPException(status_code=404, detail="User not found")
+    result = await conn.fetchrow(
+        "UPDATE users SET role='admin' WHERE email=$1 RETURNING id, email, role",
+        email,
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
 
     return {"message": f"User {email} is now an admin", "user": dict(result)}
 
 
 @app.post("/admin/remove-admin")
 async def remove_admin(
-    email: str = Body(..., embed=True), _: dict = Depends(require_admin)
+    email: str = Body(..., embed=True),
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        result = await conn.fetchrow(
-            "UPDATE users SET role='user' WHERE email=$1 RETURNING id, email, role",
-            email,
-        )
-        if not result:
-            raise HTTPException(status_code=404, detail="User not found")
+    result = await conn.fetchrow(
+        "UPDATE users SET role='user' WHERE email=$1 RETURNING id, email, role",
+        email,
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
 
     return {"message": f"Admin removed from {email}", "user": dict(result)}
 
@@ -381,56 +669,84 @@ def root():
     return {"status": "live", "version": "0.1"}
 
 
-@app.get("/students")
-async def get_students(
-    search: Optional[str] = None,
-    min_cgpa: Optional[float] = None,
-    limit: int = Query(10, le=100),
-    cursor: int = 0,
-    skill: Optional[str] = None,
-):
-    limit = min(limit, 100)
-    query = "SELECT * FROM students WHERE id > $1"
-    params = [cursor]
+def student_filters(search, min_cgpa, skill):
+    """WHERE conditions shared by the student page and its facets, params from $1."""
+    conditions = []
+    params = []
 
     if search:
-        query += f" AND name ILIKE ${len(params) + 1}"
         params.append(f"%{search}%")
+        conditions.append(f"name ILIKE ${len(params)}")
     if min_cgpa is not None:
-        query += f" AND final_cgpa >= ${len(params) + 1}"
         params.append(float(min_cgpa))
+        conditions.append(f"final_cgpa >= ${len(params)}")
     if skill:
-        query += f" AND skills LIKE ${len(params) + 1}"
+        # Exact (case-insensitive) skill, the same values the skill facet
+        # counts, so skill=Java doesn't also match JavaScript. The ILIKE
+        # skips parsing the JSON of rows that can't match.
         params.append(f"%{skill}%")
+        params.append(skill)
+        conditions.append(
+            f"skills ILIKE ${len(params) - 1} AND EXISTS "
+            f"(SELECT 1 FROM skill_set(skills) AS sk WHERE lower(sk) = lower(${len(params)}))"
+        )
 
-    query += f" ORDER BY id LIMIT ${len(params) + 1}"
-    params.append(limit)
-
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(query, *params)
+    return conditions, params
 
-    students = []
-    for row in rows:
-        student = dict(row)
-        student["skills"] = json.loads(student["skills"] or "[]")
-        student["internships"] = json.loads(student["internships"] or "[]")
-        student["projects"] = json.loads(student["projects"] or "[]")
-        students.append(student)
 
-    return students
+@app.get("/students")
+async def get_students(
+    search: Optional[str] = None,
+    min_cgpa: Optional[float] = None,
+    limit: int = Query(10, le=100),
+    cursor: int = 0,
+    skill: Optional[str] = None,
+    fields: Optional[str] = None,
+    facets: bool = False,
+):
+    limit = min(limit, 100)
+    columns = parse_fields(fields, STUDENT_FIELDS, STUDENT_SUMMARY_FIELDS)
+    conditions, params = student_filters(search, min_cgpa, skill)
+
+    query = f"SELECT {', '.join(columns)} FROM students WHERE id > ${len(params) + 1}"
+    for condition in conditions:
+        query += f" AND {condition}"
+    query += f" ORDER BY id LIMIT ${len(params) + 2}"
+    page_params = params + [cursor, limit]
+
+    async def load():
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query, *page_params)
+        return [decode_student(row) for row in rows]
+
+    # The generated SQL and its params are already a normalized key
+    students = await read_cache.get(
+        ("students", query, tuple(page_params)), ("students",), load
+    )
+    if not facets:
+        return students
+
+    # Facets don't depend on the cursor, so paging reuses the cached counts
+    async def load_facets():
+        async with pool.acquire() as conn:
+            return await student_facets(conn, conditions, params)
+
+    counts = await read_cache.get(
+        ("student_facets", tuple(conditions), tuple(params)), ("students",), load_facets
+    )
+    return {"items": students, "facets": counts}
 
 
 @app.get("/students/{student_id}")
-async def get_student_by_id(student_id: int):
+async def get_student_by_id(student_id: int, fields: Optional[str] = None):
+    columns = parse_fields(fields, STUDENT_FIELDS, STUDENT_FIELDS)
     async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT * FROM students WHERE id=$1", student_id)
+        row = await conn.fetchrow(
+            f"SELECT {', '.join(columns)} FROM students WHERE id=$1", student_id
+        )
 
     if row:
-        student = dict(row)
-        student["skills"] = json.loads(student["skills"] or "[]")
-        student["internships"] = json.loads(student["internships"] or "[]")
-        student["projects"] = json.loads(student["projects"] or "[]")
-        return student
+        return decode_student(row)
     else:
         raise HTTPException(status_code=404, detail="Student not found")
 
@@ -440,22 +756,14 @@ async def update_student(
     student_id: int,
     data: Student = Body(...),
     current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        student = await conn.fetchrow(
-            "SELECT user_id FROM students WHERE id=$1", student_id
-        )
-
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        # Only allow user to update their own profile or admin to update any
-        if student["user_id"] != current_user["id"] and current_user["role"] != "admin":
-            raise HTTPException(status_code=403, detail="Not authorized")
-
-        await conn.execute(
+    # Only allow user to update their own profile or admin to update any
+    try:
+        result = await conn.fetchrow(
             """UPDATE students SET name=$1, email=$2, phone=$3, skills=$4,
-               internships=$5, projects=$6, placed=$7, bio=$8 WHERE id=$9""",
+               internships=$5, projects=$6, placed=$7, bio=$8
+               WHERE id=$9 AND (user_id=$10 OR $11) RETURNING id""",
             data.name,
             data.email,
             data.phone,
@@ -465,32 +773,234 @@ async def update_student(
             data.placed,
             data.bio,
             student_id,
+            current_user["id"],
+            is_admin(current_user),
         )
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if not result:
+        await raise_student_write_miss(conn, student_id)
 
+    read_cache.invalidate("students")
     return {"status": "updated"}
 
 
-@app.delete("/students/{student_id}")
-async def delete_student(student_id: int, _: dict = Depends(require_admin)):
-    async with pool.acquire() as conn:
-        student = await conn.fetchrow("SELECT * FROM students WHERE id=$1", student_id)
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
+@app.patch("/students/{student_id}")
+async def patch_student(
+    student_id: int,
+    data: StudentPatch = Body(...),
+    current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    changes = data.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    if "projects" in changes:
+        changes["projects"] = [p.dict() for p in (data.projects or [])]
+    for key in STUDENT_JSON_FIELDS:
+        if key in changes:
+            changes[key] = json.dumps(changes[key] or [])
+
+    # Keys come from the StudentPatch model, never from raw input
+    assignments = [f"{column}=${i}" for i, column in enumerate(changes, start=1)]
+    params = list(changes.values())
+    query = (
+        f"UPDATE students SET {', '.join(assignments)}"
+        f" WHERE id=${len(params) + 1} AND (user_id=${len(params) + 2} OR ${len(params) + 3})"
+        " RETURNING id"
+    )
+    params += [student_id, current_user["id"], is_admin(current_user)]
+
+    try:
+        result = await conn.fetchrow(query, *params)
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if not result:
+        await raise_student_write_miss(conn, student_id)
 
-        await conn.execute("DELETE FROM students WHERE id=$1", student_id)
+    read_cache.invalidate("students")
+    return {"status": "updated", "fields": list(changes)}
 
+
+@app.delete("/students/{student_id}")
+async def delete_student(
+    student_id: int,
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    result = await conn.fetchrow(
+        "DELETE FROM students WHERE id=$1 RETURNING id", student_id
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    read_cache.invalidate("students")
     return {"status": "deleted"}
 
 
+# Student facets
+FACET_SKILL_LIMIT = 20
+# Above this many rows an unfiltered facet request is answered from
+# planner statistics and the rollups instead of counting
+FACET_ESTIMATE_MIN_ROWS = int(os.getenv("FACET_ESTIMATE_MIN_ROWS", "50000"))
+# On tables that large a filtered request is counted exactly up to this
+# many matches; past it the counts come from a random block sample of
+# about FACET_SAMPLE_SCAN_ROWS rows, scaled up
+FACET_EXACT_MAX_ROWS = int(os.getenv("FACET_EXACT_MAX_ROWS", "10000"))
+FACET_SAMPLE_SCAN_ROWS = int(os.getenv("FACET_SAMPLE_SCAN_ROWS", "50000"))
+
+CGPA_BAND_CASE = (
+    "CASE "
+    + " ".join(
+        f"WHEN final_cgpa >= {low} AND final_cgpa < {high} THEN '{label}'"
+        for label, low, high in CGPA_BANDS
+    )
+    + " END"
+)
+
+
+async def student_facets(conn, conditions: list, params: list) -> dict:
+    estimated_rows = await conn.fetchval(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = 'students'::regclass"
+    )
+    large = estimated_rows >= FACET_ESTIMATE_MIN_ROWS
+    if large and not conditions:
+        return await estimated_student_facets(conn, estimated_rows)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    if not large:
+        return await count_student_facets(conn, "students", where, params)
+
+    # A broad search on a large table would otherwise count most of it on
+    # every keystroke, while the page itself stops after a few rows
+    result = await count_student_facets(
+        conn, "students", where, params, limit=FACET_EXACT_MAX_ROWS + 1
+    )
+    if result["total"] <= FACET_EXACT_MAX_ROWS:
+        return result
+
+    # The first matches in physical order skew to the oldest students, so
+    # count a random sample of blocks instead and scale that up
+    percent = min(100.0, 100.0 * FACET_SAMPLE_SCAN_ROWS / estimated_rows)
+    sampled = await count_student_facets(
+        conn, f"students TABLESAMPLE SYSTEM ({percent:.6f})", where, params
+    )
+    result = scale_facets(sampled, 100.0 / percent)
+    # The capped count already showed at least this many match
+    result["total"] = max(result["total"], FACET_EXACT_MAX_ROWS + 1)
+    return result
+
+
+async def count_student_facets(
+    conn, source: str, where: str, params: list, limit: Optional[int] = None
+) -> dict:
+    capped = f"LIMIT {limit}" if limit else ""
+    rows = await conn.fetch(
+        f"""
+        WITH filtered AS (
+            SELECT placed, final_cgpa, skills FROM {source} {where} {capped}
+        )
+        SELECT 'total' AS facet, NULL AS value, COUNT(*) AS count FROM filtered
+        UNION ALL
+        SELECT 'placed', COALESCE(placed, FALSE)::text, COUNT(*) FROM filtered GROUP BY 2
+        UNION ALL
+        SELECT 'cgpa_band', {CGPA_BAND_CASE}, COUNT(*) FROM filtered
+        WHERE final_cgpa IS NOT NULL GROUP BY 2
+        UNION ALL
+        SELECT 'skill', sk, COUNT(*) FROM filtered CROSS JOIN LATERAL skill_set(skills) AS sk
+        GROUP BY 2
+        """,
+        *params,
+    )
+
+    result = {
+        "total": 0,
+        "placed": {"true": 0, "false": 0},
+        "cgpa_bands": {label: 0 for label, _, _ in CGPA_BANDS},
+        "skills": {},
+        "estimated": False,
+    }
+    skills = []
+    for row in rows:
+        if row["facet"] == "total":
+            result["total"] = row["count"]
+        elif row["facet"] == "placed":
+            result["placed"][row["value"]] = row["count"]
+        elif row["facet"] == "cgpa_band" and row["value"] is not None:
+            result["cgpa_bands"][row["value"]] = row["count"]
+        elif row["facet"] == "skill":
+            skills.append((row["value"], row["count"]))
+
+    skills.sort(key=lambda x: (-x[1], x[0]))
+    result["skills"] = dict(skills[:FACET_SKILL_LIMIT])
+    return result
+
+
+def scale_facets(facets: dict, factor: float) -> dict:
+    """Scale counts from a table sample up to estimates for the whole table."""
+
+    def scale(counts):
+        return {key: round(count * factor) for key, count in counts.items()}
+
+    return {
+        "total": round(facets["total"] * factor),
+        "placed": scale(facets["placed"]),
+        "cgpa_bands": scale(facets["cgpa_bands"]),
+        "skills": scale(facets["skills"]),
+        "estimated": True,
+    }
+
+
+async def estimated_student_facets(conn, estimated_rows: int) -> dict:
+    """Facets for the whole table without touching it.
+
+    Total and placed come from pg_class/pg_stats; skills and CGPA bands come
+    from the rollup tables, which are exact and only a few rows long.
+    """
+    placed_stats = await conn.fetchrow(
+        """SELECT null_frac, most_common_vals::text AS vals, most_common_freqs AS freqs
+           FROM pg_stats WHERE tablename = 'students' AND attname = 'placed'"""
+    )
+    placed_true = 0.0
+    if placed_stats and placed_stats["vals"]:
+        values = placed_stats["vals"].strip("{}").split(",")
+        for value, freq in zip(values, placed_stats["freqs"]):
+            if value == "t":
+                placed_true = freq
+
+    bucket_rows = await conn.fetch(
+        "SELECT bucket, students, placed FROM rollup_cgpa_buckets_current WHERE students > 0"
+    )
+    skill_rows = await conn.fetch(
+        "SELECT skill, students FROM rollup_skills_current WHERE students > 0 ORDER BY students DESC, skill LIMIT $1",
+        FACET_SKILL_LIMIT,
+    )
+
+    placed_count = int(estimated_rows * placed_true)
+    return {
+        "total": estimated_rows,
+        "placed": {"true": placed_count, "false": estimated_rows - placed_count},
+        "cgpa_bands": {
+            label: students
+            for label, (students, _) in cgpa_band_totals(bucket_rows).items()
+        },
+        "skills": {row["skill"]: row["students"] for row in skill_rows},
+        "estimated": True,
+    }
+
+
 # Placement routes (admin only for CUD operations)
 @app.get("/placements")
 async def get_placements(
     status: Optional[str] = None,
     limit: int = Query(10, le=100),
     cursor: int = 0,
+    fields: Optional[str] = None,
 ):
     limit = min(limit, 100)
-    query = "SELECT * FROM placement_drives WHERE id > $1"
+    columns = parse_fields(fields, PLACEMENT_FIELDS, PLACEMENT_FIELDS)
+    query = f"SELECT {', '.join(columns)} FROM placement_drives WHERE id > $1"
     params = [cursor]
 
     if status:
@@ -500,17 +1010,59 @@ async def get_placements(
     query += f" ORDER BY id LIMIT ${len(params) + 1}"
     params.append(limit)
 
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(query, *params)
+    async def load():
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+        return [dict(row) for row in rows]
+
+    return await read_cache.get(
+        ("placements", query, tuple(params)), ("placements",), load
+    )
+
 
-    return [dict(row) for row in rows]
+@app.get("/placements/stream")
+async def stream_placements(request: Request):
+    last_event_id = request.headers.get("last-event-id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    queue = placement_feed.subscribe(last_event_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {FEED_RECONNECT_SECONDS * 1000}\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            placement_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/placements/{placement_id}")
-async def get_placement_by_id(placement_id: int):
+async def get_placement_by_id(placement_id: int, fields: Optional[str] = None):
+    columns = parse_fields(fields, PLACEMENT_FIELDS, PLACEMENT_FIELDS)
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
-            "SELECT * FROM placement_drives WHERE id=$1", placement_id
+            f"SELECT {', '.join(columns)} FROM placement_drives WHERE id=$1",
+            placement_id,
         )
 
     if row:
@@ -521,20 +1073,22 @@ async def get_placement_by_id(placement_id: int):
 
 @app.post("/placements")
 async def create_placement(
-    data: PlacementDrive = Body(...), _: dict = Depends(require_admin)
+    data: PlacementDrive = Body(...),
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        result = await conn.fetchrow(
-            """INSERT INTO placement_drives (company, status, start_date, end_date, package, description)
-               VALUES ($1, $2, $3, $4, $5, $6) RETURNING id""",
-            data.company,
-            data.status,
-            data.start_date,
-            data.end_date,
-            data.package,
-            data.description,
-        )
-
+    result = await conn.fetchrow(
+        """INSERT INTO placement_drives (company, status, start_date, end_date, package, description)
+           VALUES ($1, $2, $3, $4, $5, $6) RETURNING id""",
+        data.company,
+        data.status,
+        data.start_date,
+        data.end_date,
+        data.package,
+        data.description,
+    )
+
+    read_cache.invalidate("placements")
     return {"id": result["id"], "status": "created"}
 
 
@@ -543,41 +1097,146 @@ async def update_placement(
     placement_id: int,
     data: PlacementDrive = Body(...),
     _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        placement = await conn.fetchrow(
-            "SELECT id FROM placement_drives WHERE id=$1", placement_id
-        )
-        if not placement:
-            raise HTTPException(status_code=404, detail="Placement drive not found")
-
-        await conn.execute(
-            """UPDATE placement_drives SET company=$1, status=$2, start_date=$3,
-               end_date=$4, package=$5, description=$6 WHERE id=$7""",
-            data.company,
-            data.status,
-            data.start_date,
-            data.end_date,
-            data.package,
-            data.description,
-            placement_id,
-        )
+    result = await conn.fetchrow(
+        """UPDATE placement_drives SET company=$1, status=$2, start_date=$3,
+           end_date=$4, package=$5, description=$6 WHERE id=$7 RETURNING id""",
+        data.company,
+        data.status,
+        data.start_date,
+        data.end_date,
+        data.package,
+        data.description,
+        placement_id,
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Placement drive not found")
 
+    read_cache.invalidate("placements")
     return {"status": "updated"}
 
 
 @app.delete("/placements/{placement_id}")
-async def delete_placement(placement_id: int, _: dict = Depends(require_admin)):
-    async with pool.acquire() as conn:
-        placement = await conn.fetchrow(
-            "SELECT * FROM placement_drives WHERE id=$1", placement_id
+async def delete_placement(
+    placement_id: int,
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    result = await conn.fetchrow(
+        "DELETE FROM placement_drives WHERE id=$1 RETURNING id", placement_id
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Placement drive not found")
+
+    read_cache.invalidate("placements")
+    return {"status": "deleted"}
+
+
+# Resume uploads, parsed out of band by resume_worker.py
+RESUME_MAX_BYTES = 5 * 1024 * 1024
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+
+async def read_resume_upload(
+    file: UploadFile = File(...),
+    _: str = Depends(get_token_email),
+):
+    """Validate and read the upload before the handler takes a pool connection."""
+    filename = file.filename or ""
+    if not filename.lower().endswith(RESUME_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Resume must be one of: {', '.join(RESUME_EXTENSIONS)}",
         )
-        if not placement:
-            raise HTTPException(status_code=404, detail="Placement drive not found")
 
-        await conn.execute("DELETE FROM placement_drives WHERE id=$1", placement_id)
+    content = await file.read(RESUME_MAX_BYTES + 1)
+    if len(content) > RESUME_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Resume is larger than 5MB")
+    return filename, content
 
-    return {"status": "deleted"}
+
+@app.post("/students/{student_id}/resume", status_code=202)
+async def upload_resume(
+    student_id: int,
+    upload: tuple = Depends(read_resume_upload),
+    current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    filename, content = upload
+
+    # Queue the job and wake the workers in the same statement
+    job = await conn.fetchrow(
+        """WITH job AS (
+               INSERT INTO resume_jobs (student_id, filename, content)
+               SELECT id, $2, $3 FROM students WHERE id=$1 AND (user_id=$4 OR $5)
+               RETURNING id
+           )
+           SELECT id, pg_notify('resume_jobs', id::text) FROM job""",
+        student_id,
+        filename,
+        content,
+        current_user["id"],
+        is_admin(current_user),
+    )
+    if not job:
+        await raise_student_write_miss(conn, student_id)
+
+    return {"job_id": job["id"], "status": "queued"}
+
+
+@app.get("/students/{student_id}/resume")
+async def get_resume_status(
+    student_id: int,
+    current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    job = await conn.fetchrow(
+        """SELECT j.id, j.filename, j.status, j.attempts, j.result, j.error,
+                  j.created_at, j.finished_at
+           FROM resume_jobs j JOIN students s ON s.id = j.student_id
+           WHERE j.student_id=$1 AND (s.user_id=$2 OR $3)
+           ORDER BY j.id DESC LIMIT 1""",
+        student_id,
+        current_user["id"],
+        is_admin(current_user),
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="No resume uploaded")
+
+    job = dict(job)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+@app.get("/metrics/resume-pipeline")
+async def get_resume_pipeline_metrics(window_minutes: int = Query(5, ge=1, le=1440)):
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """SELECT
+                   COUNT(*) FILTER (WHERE status='queued') AS queued,
+                   COUNT(*) FILTER (WHERE status='running') AS running,
+                   COUNT(*) FILTER (WHERE status='failed') AS failed,
+                   COUNT(*) FILTER (WHERE status='done' AND finished_at > NOW() - make_interval(mins => $1)) AS recent_done,
+                   COUNT(*) FILTER (WHERE status='failed' AND finished_at > NOW() - make_interval(mins => $1)) AS recent_failed,
+                   AVG(EXTRACT(EPOCH FROM finished_at - started_at))
+                       FILTER (WHERE status='done' AND finished_at > NOW() - make_interval(mins => $1)) AS avg_seconds,
+                   MIN(created_at) FILTER (WHERE status='queued') AS oldest_queued
+               FROM resume_jobs""",
+            window_minutes,
+        )
+
+    return {
+        "queued": row["queued"],
+        "running": row["running"],
+        "failed": row["failed"],
+        "window_minutes": window_minutes,
+        "done_in_window": row["recent_done"],
+        "failed_in_window": row["recent_failed"],
+        "resumes_per_second": round(row["recent_done"] / (window_minutes * 60), 3),
+        "avg_job_seconds": round(float(row["avg_seconds"]), 3) if row["avg_seconds"] else 0,
+        "oldest_queued": row["oldest_queued"],
+    }
 
 
 # CGPA routes
@@ -597,29 +1256,25 @@ async def add_student_cgpa(
     student_id: int,
     data: SemesterCGPA = Body(...),
     current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
-        student = await conn.fetchrow(
-            "SELECT user_id FROM students WHERE id=$1", student_id
-        )
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        # Only allow user to update their own CGPA or admin
-        if student["user_id"] != current_user["id"] and current_user["role"] != "admin":
-            raise HTTPException(status_code=403, detail="Not authorized")
-
-        await conn.execute(
-            """INSERT INTO semester_cgpa (student_id, semester, cgpa)
-               VALUES ($1, $2, $3)
-               ON CONFLICT (student_id, semester) DO UPDATE SET cgpa=$3""",
-            student_id,
-            data.semester,
-            data.cgpa,
-        )
-
-        await conn.execute("SELECT update_student_final_cgpa($1)", student_id)
-
+    # Only allow user to update their own CGPA or admin
+    result = await conn.fetchrow(
+        """INSERT INTO semester_cgpa (student_id, semester, cgpa)
+           SELECT id, $2::text, $3::real FROM students
+           WHERE id=$1 AND (user_id=$4 OR $5)
+           ON CONFLICT (student_id, semester) DO UPDATE SET cgpa=$3
+           RETURNING id""",
+        student_id,
+        data.semester,
+        data.cgpa,
+        current_user["id"],
+        is_admin(current_user),
+    )
+    if not result:
+        await raise_student_write_miss(conn, student_id)
+
+    read_cache.invalidate("students")
     return {
         "status": "updated",
         "student_id": student_id,
@@ -630,36 +1285,47 @@ async def add_student_cgpa(
 
 @app.delete("/students/{student_id}/cgpa/{semester}")
 async def delete_student_cgpa(
-    student_id: int, semester: str, current_user: dict = Depends(get_current_user)
+    student_id: int,
+    semester: str,
+    current_user: dict = Depends(get_current_user),
+    conn: asyncpg.Connection = Depends(get_conn),
 ):
-    async with pool.acquire() as conn:
+    result = await conn.fetchrow(
+        """DELETE FROM semester_cgpa sc USING students s
+           WHERE sc.student_id = s.id AND s.id=$1 AND sc.semester=$2
+             AND (s.user_id=$3 OR $4)
+           RETURNING sc.id""",
+        student_id,
+        semester,
+        current_user["id"],
+        is_admin(current_user),
+    )
+    if not result:
         student = await conn.fetchrow(
             "SELECT user_id FROM students WHERE id=$1", student_id
         )
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
-
-        if student["user_id"] != current_user["id"] and current_user["role"] != "admin":
+        if student["user_id"] != current_user["id"] and not is_admin(current_user):
             raise HTTPException(status_code=403, detail="Not authorized")
+        raise HTTPException(status_code=404, detail="Semester CGPA record not found")
 
-        result = await conn.fetchrow(
-            "DELETE FROM semester_cgpa WHERE student_id=$1 AND semester=$2 RETURNING id",
-            student_id,
-            semester,
-        )
-        if not result:
-            raise HTTPException(
-                status_code=404, detail="Semester CGPA record not found"
-            )
-
-        await conn.execute("SELECT update_student_final_cgpa($1)", student_id)
-
+    read_cache.invalidate("students")
     return {"status": "deleted", "student_id": student_id, "semester": semester}
 
 
 # Stats route
 @app.get("/stats")
 async def get_stats():
+    return await read_cache.get(("stats",), ("students", "placements"), load_stats)
+
+
+@app.get("/metrics/read-cache")
+async def get_read_cache_metrics():
+    return read_cache.metrics()
+
+
+async def load_stats():
     async with pool.acquire() as conn:
         total_students = await conn.fetchval("SELECT COUNT(*) FROM students")
         placed_count = await conn.fetchval(
@@ -714,11 +1380,150 @@ async def get_stats():
     }
 
 
+# Analytics routes, served from the rollup tables
+ROLLUP_FOLD_SECONDS = float(os.getenv("ROLLUP_FOLD_SECONDS", "10"))
+
+
+async def fold_rollups_periodically():
+    # Every worker runs this; the fold's advisory lock lets one through at a time
+    while True:
+        await asyncio.sleep(ROLLUP_FOLD_SECONDS)
+        try:
+            async with pool.acquire() as conn:
+                await fold_rollup_deltas(conn)
+        except Exception as e:
+            logger.error(f"Folding rollup deltas failed: {e}")
+
+
+def cgpa_band_totals(bucket_rows) -> dict:
+    """Fold rollup_cgpa_buckets rows into CGPA_BANDS as {label: (students, placed)}."""
+    totals = {}
+    for label, low, high in CGPA_BANDS:
+        in_band = [r for r in bucket_rows if low <= r["bucket"] * CGPA_BUCKET_WIDTH < high]
+        totals[label] = (
+            sum(r["students"] for r in in_band),
+            sum(r["placed"] for r in in_band),
+        )
+    return totals
+
+
+@app.get("/analytics/cgpa-histogram")
+async def get_cgpa_histogram():
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT bucket, students, placed FROM rollup_cgpa_buckets_current WHERE students > 0 ORDER BY bucket"
+        )
+
+    return [
+        {
+            "min_cgpa": row["bucket"] * CGPA_BUCKET_WIDTH,
+            "max_cgpa": (row["bucket"] + 1) * CGPA_BUCKET_WIDTH,
+            "students": row["students"],
+            "placed": row["placed"],
+        }
+        for row in rows
+    ]
+
+
+@app.get("/analytics/placement-by-cgpa")
+async def get_placement_by_cgpa():
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT bucket, students, placed FROM rollup_cgpa_buckets_current WHERE students > 0"
+        )
+
+    bands = []
+    for label, (students, placed) in cgpa_band_totals(rows).items():
+        bands.append(
+            {
+                "band": label,
+                "students": students,
+                "placed": placed,
+                "placement_rate": round(placed / students * 100, 1) if students else 0,
+            }
+        )
+
+    return bands
+
+
+@app.get("/analytics/placement-by-skill")
+async def get_placement_by_skill(
+    limit: int = Query(20, le=100),
+    min_students: int = 1,
+):
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """SELECT skill, students, placed FROM rollup_skills_current
+               WHERE students >= GREATEST($1, 1)
+               ORDER BY students DESC, skill LIMIT $2""",
+            min_students,
+            limit,
+        )
+
+    return [
+        {
+            "skill": row["skill"],
+            "students": row["students"],
+            "placed": row["placed"],
+            "placement_rate": round(row["placed"] / row["students"] * 100, 1),
+        }
+        for row in rows
+    ]
+
+
+@app.get("/analytics/companies")
+async def get_company_trends(
+    company: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    query = """
+        SELECT company, month, SUM(drives)::int AS drives,
+               SUM(packaged)::int AS packaged, SUM(package_sum) AS package_sum
+        FROM rollup_company_months_current WHERE drives > 0
+    """
+    params = []
+
+    if company:
+        query += f" AND company = ${len(params) + 1}"
+        params.append(company)
+    if status:
+        query += f" AND status = ${len(params) + 1}"
+        params.append(status)
+
+    query += " GROUP BY company, month ORDER BY month, company"
+
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(query, *params)
+
+    return [
+        {
+            "company": row["company"],
+            # Undated drives are stored under '-infinity', which asyncpg reads as date.min
+            "month": row["month"].isoformat() if row["month"] != date.min else None,
+            "drives": row["drives"],
+            "avg_package": int(row["package_sum"] / row["packaged"])
+            if row["packaged"]
+            else 0,
+        }
+        for row in rows
+    ]
+
+
+@app.post("/admin/analytics/rebuild")
+async def rebuild_analytics(
+    dry_run: bool = False,
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    return await rebuild_rollups(conn, apply=not dry_run)
+
+
 # Bulk upload (admin only)
-@app.post("/admin/upload")
-async def bulk_upload_csv(
-    file: UploadFile = File(...), _: dict = Depends(require_admin)
+async def parse_student_csv(
+    file: UploadFile = File(...),
+    _: str = Depends(get_token_email),
 ):
+    """Read and parse the CSV into (DataFrame, upsert params) before a connection is taken."""
     content = await file.read()
     try:
         decoded = content.decode("utf-8")
@@ -760,6 +1565,16 @@ async def bulk_upload_csv(
         except Exception as e:
             logger.error(f"Error processing row {idx}: {e}")
 
+    return df, params
+
+
+@app.post("/admin/upload")
+async def bulk_upload_csv(
+    upload: tuple = Depends(parse_student_csv),
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    df, params = upload
     query = """
         INSERT INTO students (name, email, phone, skills, internships, projects, placed)
         VALUES ($1, $2, $3, $4, $5, $6, $7)
@@ -774,36 +1589,170 @@ async def bulk_upload_csv(
            OR students.placed IS DISTINCT FROM excluded.placed
     """
 
-    async with pool.acquire() as conn:
-        await conn.executemany(query, params)
+    await conn.executemany(query, params)
 
-        # Handle CGPA data
-        for idx, row in df.iterrows():
-            try:
-                email = str(row.get("email", "")).strip()
-                if email:
-                    student_id = await conn.fetchval(
-                        "SELECT id FROM students WHERE email=$1", email
-                    )
-                    if student_id:
-                        csv_cgpa = row.get("cgpa") or row.get("final_cgpa")
-                        if pd.notna(csv_cgpa) and csv_cgpa != "":
-                            try:
-                                cgpa_value = float(csv_cgpa)
-                                await conn.execute(
-                                    """INSERT INTO semester_cgpa (student_id, semester, cgpa)
-                                       VALUES ($1, $2, $3)
-                                       ON CONFLICT (student_id, semester) DO UPDATE SET cgpa=$3""",
-                                    student_id,
-                                    "Overall",
-                                    cgpa_value,
-                                )
-                            except ValueError:
-                                pass
-            except Exception as e:
-                logger.error(f"Error processing CGPA for row {idx}: {e}")
-
-    return {"message": "Students updated successfully"}
+    # Handle CGPA data
+    for idx, row in df.iterrows():
+        try:
+            email = str(row.get("email", "")).strip()
+            if email:
+                student_id = await conn.fetchval(
+                    "SELECT id FROM students WHERE email=$1", email
+                )
+                if student_id:
+                    csv_cgpa = row.get("cgpa") or row.get("final_cgpa")
+                    if pd.notna(csv_cgpa) and csv_cgpa != "":
+                        try:
+                            cgpa_value = float(csv_cgpa)
+                            await conn.execute(
+                                """INSERT INTO semester_cgpa (student_id, semester, cgpa)
+                                   VALUES ($1, $2, $3)
+                                   ON CONFLICT (student_id, semester) DO UPDATE SET cgpa=$3""",
+                                student_id,
+                                "Overall",
+                                cgpa_value,
+                            )
+                        except ValueError:
+                            pass
+        except Exception as e:
+            logger.error(f"Error processing CGPA for row {idx}: {e}")
+
+    read_cache.invalidate("students")
+
+    batch_ids = await conn.fetchval(
+        "SELECT array_agg(id) FROM students WHERE email = ANY($1::text[])",
+        [p[1] for p in params],
+    )
+    if batch_ids:
+        start_duplicate_scan(batch_ids)
+
+    return {
+        "message": "Students updated successfully",
+        "duplicate_scan": "started" if batch_ids else "skipped",
+    }
+
+
+# Duplicate detection (admin only)
+# Keeps references to running scans so they aren't garbage collected mid-run
+duplicate_scans = set()
+full_duplicate_scan: Optional[asyncio.Task] = None
+
+
+async def run_duplicate_scan(batch_ids=None):
+    start = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            found = await scan_duplicates(conn, batch_ids)
+    except Exception as e:
+        logger.error(f"Duplicate scan failed: {e}")
+        return
+    if found is None:
+        logger.info("Full duplicate scan skipped, another worker is already running one")
+        return
+    scope = f"{len(batch_ids)} imported" if batch_ids else "all"
+    logger.info(
+        f"Duplicate scan over {scope} students: {found} suggestions in {time.perf_counter() - start:.2f}s"
+    )
+
+
+def start_duplicate_scan(batch_ids=None):
+    task = asyncio.create_task(run_duplicate_scan(batch_ids))
+    duplicate_scans.add(task)
+    task.add_done_callback(duplicate_scans.discard)
+    return task
+
+
+@app.post("/admin/duplicates/scan", status_code=202)
+async def scan_for_duplicates(_: dict = Depends(require_admin)):
+    global full_duplicate_scan
+    # Scans in other workers are kept out by the advisory lock in scan_duplicates
+    if full_duplicate_scan and not full_duplicate_scan.done():
+        return {"status": "already running"}
+    full_duplicate_scan = start_duplicate_scan()
+    return {"status": "started"}
+
+
+@app.get("/admin/duplicates")
+async def get_duplicate_suggestions(
+    status: str = "open",
+    min_score: float = 0,
+    limit: int = Query(50, le=200),
+    cursor: Optional[str] = None,
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    if status not in ("open", "dismissed"):
+        raise HTTPException(status_code=400, detail="status must be open or dismissed")
+
+    # The cursor carries the last (score, id) itself, so paging survives that
+    # suggestion being deleted or rescored in the meantime
+    after = None
+    if cursor:
+        try:
+            score, suggestion_id = cursor.split(":")
+            after = (float(score), int(suggestion_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query = """SELECT d.id, d.score, d.reasons, d.created_at,
+                      a.id AS student_id, a.name AS student_name, a.email AS student_email,
+                      a.phone AS student_phone,
+                      b.id AS duplicate_id, b.name AS duplicate_name, b.email AS duplicate_email,
+                      b.phone AS duplicate_phone
+               FROM duplicate_suggestions d
+               JOIN students a ON a.id = d.student_id
+               JOIN students b ON b.id = d.duplicate_of
+               WHERE d.status = $1 AND d.score >= $2"""
+    params = [status, min_score]
+    # Strongest matches first, seeking into the open-score index by (score, id)
+    if after:
+        params += list(after)
+        query += f" AND (d.score, d.id) < (${len(params) - 1}::real, ${len(params)})"
+    params.append(limit)
+    query += f" ORDER BY d.score DESC, d.id DESC LIMIT ${len(params)}"
+
+    rows = await conn.fetch(query, *params)
+
+    return [
+        {
+            "id": row["id"],
+            "score": round(row["score"], 3),
+            # Unrounded, pass back as `cursor` to get the page after this one
+            "cursor": f"{row['score']!r}:{row['id']}",
+            "reasons": json.loads(row["reasons"] or "[]"),
+            "created_at": row["created_at"],
+            "student": {
+                "id": row["student_id"],
+                "name": row["student_name"],
+                "email": row["student_email"],
+                "phone": row["student_phone"],
+            },
+            # The older record, usually the one to merge into
+            "duplicate_of": {
+                "id": row["duplicate_id"],
+                "name": row["duplicate_name"],
+                "email": row["duplicate_email"],
+                "phone": row["duplicate_phone"],
+            },
+        }
+        for row in rows
+    ]
+
+
+@app.post("/admin/duplicates/{suggestion_id}/dismiss")
+async def dismiss_duplicate_suggestion(
+    suggestion_id: int,
+    _: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_conn),
+):
+    result = await conn.fetchrow(
+        "UPDATE duplicate_suggestions SET status='dismissed' WHERE id=$1 RETURNING id",
+        suggestion_id,
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+
+    return {"status": "dismissed"}
 
 
 if __name__ == "__main__":
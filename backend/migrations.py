@@ -0,0 +1,343 @@
+"""Versioned schema migrations.
+
+Every worker calls `migrate()` on startup. When schema_migrations is already
+at the latest version that's a single SELECT and no DDL runs at all. When it
+isn't, one process takes an advisory lock and applies the pending versions
+while the rest poll for the lock and then find nothing left to do.
+
+A migration is a list of steps. A step is either a SQL string, an async
+callable taking the connection, or a `concurrent_index(...)`. Migrations
+without concurrent steps run in a single transaction together with their
+version row; CREATE INDEX CONCURRENTLY can't run inside a transaction, so
+those migrations run step by step and must be safe to re-run.
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # print current and latest version
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import asyncpg
+from dotenv import load_dotenv
+
+from analytics import ROLLUP_SCHEMA, rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary but fixed, shared by every process migrating this database
+MIGRATION_LOCK_KEY = 7261029
+MIGRATION_LOCK_POLL_SECONDS = 0.5
+
+
+def concurrent_index(name: str, definition: str):
+    """Step that builds an index without blocking writes.
+
+    A failed concurrent build leaves an INVALID index behind which
+    IF NOT EXISTS would happily skip, so drop that first.
+    """
+
+    async def step(conn):
+        invalid = await conn.fetchval(
+            """SELECT NOT i.indisvalid FROM pg_index i
+               JOIN pg_class c ON c.oid = i.indexrelid
+               WHERE c.relname = $1""",
+            name,
+        )
+        if invalid:
+            await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+
+    step.concurrent = True
+    return step
+
+
+async def _rebuild_rollups(conn):
+    await rebuild_rollups(conn)
+
+
+MIGRATIONS = [
+    (
+        1,
+        "initial schema",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                role VARCHAR(50) DEFAULT 'user',
+                created_at TIMESTAMPTZ DEFAULT NOW()
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS students (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER UNIQUE REFERENCES users(id) ON DELETE CASCADE,
+                name TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                phone TEXT,
+                final_cgpa REAL,
+                skills TEXT,
+                internships TEXT,
+                projects TEXT,
+                placed BOOLEAN DEFAULT FALSE,
+                bio TEXT,
+                created TIMESTAMPTZ DEFAULT NOW()
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS semester_cgpa (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
+                semester TEXT NOT NULL,
+                cgpa REAL NOT NULL,
+                UNIQUE (student_id, semester)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS placement_drives (
+                id SERIAL PRIMARY KEY,
+                company TEXT NOT NULL,
+                status TEXT CHECK (status IN ('ongoing', 'completed', 'starting_soon')) DEFAULT 'starting_soon',
+                start_date TIMESTAMPTZ,
+                end_date TIMESTAMPTZ,
+                package INTEGER,
+                description TEXT
+            )
+            """,
+            """
+            CREATE OR REPLACE FUNCTION update_student_final_cgpa(student_id_param INTEGER)
+            RETURNS VOID AS $$
+            DECLARE
+                avg_cgpa REAL;
+            BEGIN
+                SELECT AVG(cgpa) INTO avg_cgpa
+                FROM semester_cgpa
+                WHERE student_id = student_id_param;
+
+                UPDATE students
+                SET final_cgpa = avg_cgpa
+                WHERE id = student_id_param;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+        ],
+    ),
+    (
+        2,
+        "placement change feed",
+        [
+            # Every placement drive write (and every flip of students.placed)
+            # is pushed to listeners via NOTIFY. Event ids come from a
+            # sequence so they are comparable across workers.
+            "CREATE SEQUENCE IF NOT EXISTS placement_events_seq",
+            """
+            CREATE OR REPLACE FUNCTION notify_placement_change()
+            RETURNS TRIGGER AS $$
+            DECLARE
+                row_id INTEGER;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    row_id := OLD.id;
+                ELSE
+                    row_id := NEW.id;
+                END IF;
+
+                PERFORM pg_notify('placement_changes', json_build_object(
+                    'event_id', nextval('placement_events_seq'),
+                    'table', TG_TABLE_NAME,
+                    'op', lower(TG_OP),
+                    'id', row_id
+                )::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """,
+            """
+            DROP TRIGGER IF EXISTS placement_drives_notify ON placement_drives;
+            CREATE TRIGGER placement_drives_notify
+            AFTER INSERT OR UPDATE OR DELETE ON placement_drives
+            FOR EACH ROW EXECUTE FUNCTION notify_placement_change();
+            """,
+            """
+            DROP TRIGGER IF EXISTS students_placed_notify ON students;
+            CREATE TRIGGER students_placed_notify
+            AFTER UPDATE OF placed ON students
+            FOR EACH ROW WHEN (OLD.placed IS DISTINCT FROM NEW.placed)
+            EXECUTE FUNCTION notify_placement_change();
+            """,
+        ],
+    ),
+    (
+        3,
+        "analytics rollups",
+        [ROLLUP_SCHEMA, _rebuild_rollups],
+    ),
+    (
+        4,
+        "covering index for the placement list",
+        [
+            # Serves the status filter in cursor order. Only narrow `fields=`
+            # projections are index-only; the default view reads description
+            # off the heap. students gets no such index: its default view needs
+            # the JSON columns, and indexing final_cgpa/placed would make every
+            # CGPA or placement update non-HOT.
+            concurrent_index(
+                "idx_placement_drives_summary",
+                "ON placement_drives (status, id) INCLUDE (company, start_date, end_date, package)",
+            ),
+        ],
+    ),
+    (
+        5,
+        "resume job queue",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS resume_jobs (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                filename TEXT NOT NULL,
+                content BYTEA NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued'
+                    CHECK (status IN ('queued', 'running', 'done', 'failed')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ
+            )
+            """,
+            # Workers only ever look at unfinished jobs
+            """
+            CREATE INDEX IF NOT EXISTS idx_resume_jobs_pending
+            ON resume_jobs (id) WHERE status IN ('queued', 'running')
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_resume_jobs_student
+            ON resume_jobs (student_id, id)
+            """,
+        ],
+    ),
+    (
+        6,
+        "duplicate suggestions",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS duplicate_suggestions (
+                id SERIAL PRIMARY KEY,
+                student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                duplicate_of INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                score REAL NOT NULL,
+                reasons TEXT,
+                status TEXT NOT NULL DEFAULT 'open'
+                    CHECK (status IN ('open', 'dismissed')),
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                UNIQUE (student_id, duplicate_of),
+                CHECK (student_id > duplicate_of)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_duplicate_suggestions_open
+            ON duplicate_suggestions (score, id) WHERE status = 'open'
+            """,
+        ],
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def current_version(conn) -> int:
+    exists = await conn.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not exists:
+        return 0
+    return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+
+
+async def _run_step(conn, step):
+    if callable(step):
+        await step(conn)
+    else:
+        await conn.execute(step)
+
+
+async def _apply(conn, version: int, name: str, steps: list):
+    record = "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)"
+
+    if any(getattr(step, "concurrent", False) for step in steps):
+        for step in steps:
+            await _run_step(conn, step)
+        await conn.execute(record, version, name)
+        return
+
+    async with conn.transaction():
+        for step in steps:
+            await _run_step(conn, step)
+        await conn.execute(record, version, name)
+
+
+async def migrate(conn) -> int:
+    """Bring the schema up to LATEST_VERSION, returning the version it ends at."""
+    start = time.perf_counter()
+    version = await current_version(conn)
+    if version >= LATEST_VERSION:
+        logger.info(
+            f"Schema current at v{version}, checked in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return version
+
+    # Poll with pg_try_advisory_lock rather than blocking in pg_advisory_lock:
+    # a session parked inside that statement holds a snapshot, and
+    # CREATE INDEX CONCURRENTLY in the lock holder waits for every older
+    # snapshot, so blocked waiters would deadlock it
+    while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", MIGRATION_LOCK_KEY):
+        if await current_version(conn) >= LATEST_VERSION:
+            return LATEST_VERSION
+        await asyncio.sleep(MIGRATION_LOCK_POLL_SECONDS)
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        # Someone else may have finished while we waited for the lock
+        version = await current_version(conn)
+        for number, name, steps in MIGRATIONS:
+            if number <= version:
+                continue
+            step_start = time.perf_counter()
+            await _apply(conn, number, name, steps)
+            logger.info(
+                f"Applied migration v{number} ({name}) in {time.perf_counter() - step_start:.2f}s"
+            )
+            version = number
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
+
+    logger.info(f"Schema migrated to v{version} in {time.perf_counter() - start:.2f}s")
+    return version
+
+
+async def _main(argv):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    conn = await asyncpg.connect(dsn=os.getenv("DB_URL"))
+    try:
+        if "--status" in argv:
+            print(f"current: v{await current_version(conn)}, latest: v{LATEST_VERSION}")
+        else:
+            await migrate(conn)
+    finally:
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,169 @@
+"""Pull skills and internships out of uploaded resumes.
+
+Everything here is plain CPU work on bytes, so `parse_resume` is safe to run
+in a process pool. PDF needs the optional `pypdf` package; DOCX and text only
+use the standard library.
+"""
+
+import io
+import re
+import zipfile
+from xml.etree import ElementTree
+
+# Canonical skill -> extra spellings people use on resumes
+SKILL_ALIASES = {
+    "Python": [],
+    "SQL": [],
+    "React": ["ReactJS", "React.js"],
+    "ML": ["Machine Learning"],
+    "DL": ["Deep Learning"],
+    "NLP": ["Natural Language Processing"],
+    "DSA": ["Data Structures", "Algorithms"],
+    "Go": ["Golang"],
+    "Docker": [],
+    "Kubernetes": ["k8s"],
+    "Node.js": ["NodeJS", "Node"],
+    "Next.js": ["NextJS"],
+    "Pandas": [],
+    "NumPy": [],
+    "TensorFlow": [],
+    "PyTorch": [],
+    "FastAPI": [],
+    "Django": [],
+    "Flask": [],
+    "Java": [],
+    "Spring Boot": ["Spring"],
+    "C++": ["CPP"],
+    "C#": [],
+    "TypeScript": [],
+    "JavaScript": ["JS"],
+    "Flutter": [],
+    "Rust": [],
+    "HTML": ["HTML5"],
+    "CSS": ["CSS3"],
+    "PostgreSQL": ["Postgres"],
+    "MongoDB": ["Mongo"],
+    "AWS": [],
+    "Git": [],
+    "Linux": [],
+}
+
+# Short names that are also ordinary words only count in their exact case
+CASE_SENSITIVE = {"Go", "ML", "DL", "JS", "Node", "Spring", "Mongo", "Git"}
+
+MAX_INTERNSHIP_LENGTH = 120
+MAX_INTERNSHIPS = 10
+# Uploads are capped at 5MB, but a compressed document.xml can expand far
+# beyond that; a real resume is a few hundred KB
+MAX_DOCX_XML_BYTES = 20 * 1024 * 1024
+
+_BOUNDARY_BEFORE = r"(?<![\w+#.])"
+_BOUNDARY_AFTER = r"(?![\w+#])"
+
+
+def _build_patterns():
+    lookup = {}
+    insensitive, sensitive = [], []
+    for canonical, aliases in SKILL_ALIASES.items():
+        for name in [canonical] + aliases:
+            if name in CASE_SENSITIVE:
+                lookup[name] = canonical
+                sensitive.append(name)
+            else:
+                lookup[name.lower()] = canonical
+                insensitive.append(name)
+
+    def alternation(names):
+        # Longest first so "Spring Boot" wins over "Spring"
+        names = sorted(names, key=len, reverse=True)
+        return _BOUNDARY_BEFORE + "(" + "|".join(re.escape(n) for n in names) + ")" + _BOUNDARY_AFTER
+
+    return (
+        re.compile(alternation(insensitive), re.IGNORECASE),
+        re.compile(alternation(sensitive)),
+        lookup,
+    )
+
+
+_INSENSITIVE_RE, _SENSITIVE_RE, _SKILL_LOOKUP = _build_patterns()
+_INTERNSHIP_RE = re.compile(r"\bintern(ship)?s?\b", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[\s\-*•▪●>]+")
+
+
+class ResumeParseError(Exception):
+    pass
+
+
+def extract_text(content: bytes, filename: str) -> str:
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        return _pdf_text(content)
+    if name.endswith(".docx"):
+        return _docx_text(content)
+    if name.endswith(".txt"):
+        return content.decode("utf-8", errors="replace")
+    raise ResumeParseError(f"Unsupported resume format: {filename}")
+
+
+def _pdf_text(content: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ResumeParseError("PDF resumes need the pypdf package installed")
+
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        raise ResumeParseError(f"Could not read PDF: {e}")
+
+
+def _docx_text(content: bytes) -> str:
+    w = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            # Bounded read, the size in the zip header can't be trusted
+            with archive.open("word/document.xml") as member:
+                xml = member.read(MAX_DOCX_XML_BYTES + 1)
+        if len(xml) > MAX_DOCX_XML_BYTES:
+            raise ResumeParseError("Could not read DOCX: document is too large")
+        root = ElementTree.fromstring(xml)
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ResumeParseError(f"Could not read DOCX: {e}")
+
+    paragraphs = []
+    for paragraph in root.iter(f"{w}p"):
+        paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{w}t")))
+    return "\n".join(paragraphs)
+
+
+def extract_skills(text: str) -> list:
+    found = []
+    for match in _INSENSITIVE_RE.finditer(text):
+        found.append(_SKILL_LOOKUP[match.group(1).lower()])
+    for match in _SENSITIVE_RE.finditer(text):
+        found.append(_SKILL_LOOKUP[match.group(1)])
+    # Keep first-seen order, drop repeats
+    return list(dict.fromkeys(found))
+
+
+def extract_internships(text: str) -> list:
+    internships = []
+    for line in text.splitlines():
+        if not _INTERNSHIP_RE.search(line):
+            continue
+        line = _BULLET_RE.sub("", line).strip()
+        if line and len(line) <= MAX_INTERNSHIP_LENGTH and line not in internships:
+            internships.append(line)
+        if len(internships) >= MAX_INTERNSHIPS:
+            break
+    return internships
+
+
+def parse_resume(content: bytes, filename: str) -> dict:
+    text = extract_text(content, filename)
+    return {
+        "skills": extract_skills(text),
+        "internships": extract_internships(text),
+        "chars": len(text),
+    }
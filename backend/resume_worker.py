@@ -0,0 +1,250 @@
+"""Background worker for the resume_jobs queue.
+
+Claims jobs in batches with FOR UPDATE SKIP LOCKED, so any number of these
+can run side by side. Parsing happens in a process pool; the extracted
+skills and internships are merged into students and the jobs are closed
+out in one transaction per batch. A job whose worker died is picked up
+again once its lease runs out, up to RESUME_MAX_ATTEMPTS times. A parse
+that runs past RESUME_PARSE_TIMEOUT, or is lost when a parser process
+crashes, goes back in the queue (still counting as an attempt) and the
+pool is replaced. A batch whose results can't be written is requeued too.
+
+    python resume_worker.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import asyncpg
+from dotenv import load_dotenv
+
+from resume_parser import parse_resume
+
+load_dotenv()
+
+RESUME_WORKERS = int(os.getenv("RESUME_WORKERS", str(os.cpu_count() or 1)))
+RESUME_BATCH_SIZE = int(os.getenv("RESUME_BATCH_SIZE", "32"))
+RESUME_POLL_SECONDS = float(os.getenv("RESUME_POLL_SECONDS", "5"))
+RESUME_LEASE_SECONDS = int(os.getenv("RESUME_LEASE_SECONDS", "300"))
+RESUME_MAX_ATTEMPTS = int(os.getenv("RESUME_MAX_ATTEMPTS", "3"))
+# Counted from when a process picks the job up
+RESUME_PARSE_TIMEOUT = float(os.getenv("RESUME_PARSE_TIMEOUT", "60"))
+RESUME_CHANNEL = "resume_jobs"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+logger = logging.getLogger("resume_worker")
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+async def parse(executor, slots: asyncio.Semaphore, job):
+    # Submit only when a process is free, so the timeout covers the parse
+    # itself and not the wait behind the rest of the batch
+    async with slots:
+        future = asyncio.get_running_loop().run_in_executor(
+            executor, parse_resume, job["content"], job["filename"]
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=RESUME_PARSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ParseTimeout(f"parsing took longer than {RESUME_PARSE_TIMEOUT:.0f}s")
+
+
+def replace_executor(executor: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """Swap in a fresh pool after a parser process crashed or hung.
+
+    ProcessPoolExecutor can't cancel a running call, so a hung parser has
+    to be terminated or it keeps its slot forever.
+    """
+    for process in list(executor._processes.values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+    return ProcessPoolExecutor(max_workers=RESUME_WORKERS)
+
+
+async def claim_jobs(conn) -> list:
+    # Jobs that blew through their lease too many times are given up on
+    await conn.execute(
+        """UPDATE resume_jobs SET status='failed', finished_at=NOW(),
+               error=COALESCE(error, 'worker lost the job too many times')
+           WHERE status='running' AND attempts >= $1
+             AND started_at < NOW() - make_interval(secs => $2)""",
+        RESUME_MAX_ATTEMPTS,
+        RESUME_LEASE_SECONDS,
+    )
+    return await conn.fetch(
+        """UPDATE resume_jobs SET status='running', started_at=NOW(), attempts=attempts + 1
+           WHERE id IN (
+               SELECT id FROM resume_jobs
+               WHERE (status='queued'
+                      OR (status='running' AND started_at < NOW() - make_interval(secs => $2)))
+                 AND attempts < $3
+               ORDER BY id
+               FOR UPDATE SKIP LOCKED
+               LIMIT $1
+           )
+           RETURNING id, student_id, filename, content""",
+        RESUME_BATCH_SIZE,
+        RESUME_LEASE_SECONDS,
+        RESUME_MAX_ATTEMPTS,
+    )
+
+
+def merge(existing, extracted: list) -> str:
+    """Add extracted values to a JSON list column without duplicating or reordering."""
+    current = json.loads(existing or "[]")
+    seen = {str(v).strip().lower() for v in current}
+    for value in extracted:
+        if value.strip().lower() not in seen:
+            current.append(value)
+            seen.add(value.strip().lower())
+    return json.dumps(current)
+
+
+async def requeue_jobs(conn, jobs: list):
+    """Put (id, error) jobs back in the queue, or fail them once out of attempts.
+
+    The attempt still counts, so a resume that keeps hanging or crashing the
+    parser is eventually given up on.
+    """
+    await conn.executemany(
+        """UPDATE resume_jobs SET
+               status = CASE WHEN attempts >= $3 THEN 'failed' ELSE 'queued' END,
+               finished_at = CASE WHEN attempts >= $3 THEN NOW() END,
+               error = $2
+           WHERE id = $1 AND status = 'running'""",
+        [(job_id, error, RESUME_MAX_ATTEMPTS) for job_id, error in jobs],
+    )
+
+
+async def write_back(conn, jobs: list, results: list):
+    """Merge a whole batch into students and close its jobs in one transaction."""
+    done, failed, requeued = [], [], []
+    for job, result in zip(jobs, results):
+        if isinstance(result, BrokenProcessPool):
+            # Lost with a crashed pool, most likely because of another job
+            requeued.append((job["id"], "parser process crashed"))
+        elif isinstance(result, ParseTimeout):
+            # Possibly just stuck behind a hung process; retry like a crash
+            requeued.append((job["id"], f"ParseTimeout: {result}"))
+        elif isinstance(result, Exception):
+            failed.append((job["id"], f"{type(result).__name__}: {result}"))
+        else:
+            done.append((job, result))
+
+    async with conn.transaction():
+        if done:
+            student_ids = list({job["student_id"] for job, _ in done})
+            rows = await conn.fetch(
+                "SELECT id, skills, internships FROM students WHERE id = ANY($1::int[]) FOR UPDATE",
+                student_ids,
+            )
+            students = {row["id"]: dict(row) for row in rows}
+            for job, result in done:
+                student = students.get(job["student_id"])
+                if student is None:
+                    continue
+                student["skills"] = merge(student["skills"], result["skills"])
+                student["internships"] = merge(student["internships"], result["internships"])
+
+            await conn.executemany(
+                "UPDATE students SET skills=$2, internships=$3 WHERE id=$1",
+                [(s["id"], s["skills"], s["internships"]) for s in students.values()],
+            )
+            await conn.executemany(
+                """UPDATE resume_jobs SET status='done', finished_at=NOW(), result=$2, error=NULL
+                   WHERE id=$1""",
+                [(job["id"], json.dumps(result)) for job, result in done],
+            )
+
+        if failed:
+            # Parse errors are deterministic, retrying won't help
+            await conn.executemany(
+                "UPDATE resume_jobs SET status='failed', finished_at=NOW(), error=$2 WHERE id=$1",
+                failed,
+            )
+
+        if requeued:
+            await requeue_jobs(conn, requeued)
+
+    return len(done), len(failed), len(requeued)
+
+
+async def run():
+    pool = await asyncpg.create_pool(dsn=os.getenv("DB_URL"), min_size=1, max_size=2)
+    wakeup = asyncio.Event()
+
+    listener = await asyncpg.connect(dsn=os.getenv("DB_URL"))
+    await listener.add_listener(RESUME_CHANNEL, lambda *args: wakeup.set())
+
+    logger.info(f"Parsing resumes with {RESUME_WORKERS} processes")
+
+    executor = ProcessPoolExecutor(max_workers=RESUME_WORKERS)
+    slots = asyncio.Semaphore(RESUME_WORKERS)
+    try:
+        while True:
+            # Clear before claiming so a NOTIFY that lands mid-claim isn't lost
+            wakeup.clear()
+            try:
+                async with pool.acquire() as conn:
+                    jobs = await claim_jobs(conn)
+            except Exception as e:
+                logger.error(f"Claiming jobs failed: {e}")
+                await asyncio.sleep(RESUME_POLL_SECONDS)
+                continue
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=RESUME_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(parse(executor, slots, job) for job in jobs), return_exceptions=True
+            )
+            if any(isinstance(r, (ParseTimeout, BrokenProcessPool)) for r in results):
+                logger.warning("Parser process hung or crashed, replacing the pool")
+                executor = replace_executor(executor)
+
+            try:
+                async with pool.acquire() as conn:
+                    done, failed, requeued = await write_back(conn, jobs, results)
+            except Exception as e:
+                # write_back is one transaction, so nothing from the batch landed
+                logger.error(f"Writing back a batch of {len(jobs)} failed, requeueing: {e}")
+                try:
+                    async with pool.acquire() as conn:
+                        await requeue_jobs(
+                            conn, [(job["id"], f"write back failed: {e}") for job in jobs]
+                        )
+                except Exception as requeue_error:
+                    logger.error(
+                        f"Requeueing failed, jobs wait for their lease to expire: {requeue_error}"
+                    )
+                continue
+
+            duration = time.perf_counter() - start
+            logger.info(
+                f"⚡ batch of {len(jobs)}: {done} done, {failed} failed, {requeued} requeued "
+                f"in {duration:.3f}s ({len(jobs) / duration:.1f} resumes/s)"
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,291 @@
+"""Production launcher: one listening socket, N pre-forked uvicorn workers.
+
+The master applies pending migrations once, imports the app (and with it
+pandas, asyncpg, pydantic...) and then forks, so workers start warm, share
+those pages copy-on-write and skip the migration check. DB_POOL_BUDGET is
+the total number of Postgres connections this deployment may hold; it is
+split across the workers plus one spare share for the replacement started
+during a rolling restart, minus the connection each worker keeps open for
+the placement feed listener.
+
+    python serve.py --workers 4 --pool-budget 80
+
+Signals to the master:
+    TERM / INT   graceful shutdown of all workers
+    HUP          rolling restart, one worker at a time; each replacement
+                 has to finish startup before the worker it replaces stops
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger("serve")
+
+# Connections a worker holds outside its pool (the LISTEN connection)
+EXTRA_CONNECTIONS_PER_WORKER = 1
+# Workers started on top of --workers while a rolling restart swaps one out
+SURGE_WORKERS = 1
+WORKER_SHUTDOWN_TIMEOUT = 30
+# How long uvicorn waits for open connections before cancelling them and
+# running lifespan shutdown. SSE streams on /placements/stream never finish
+# by themselves, so without this every stop ran into the SIGKILL above.
+WORKER_GRACEFUL_TIMEOUT = 10
+WORKER_STARTUP_TIMEOUT = 60
+# A worker that dies sooner than this after spawning is probably failing
+# startup (database down, bad config), so back off instead of fork-looping
+RAPID_EXIT_SECONDS = 10
+MAX_RESPAWN_DELAY = 60
+
+
+def split_pool_budget(budget: int, workers: int):
+    """Per-worker (min_size, max_size) so all workers together stay within budget."""
+    per_worker = budget // workers - EXTRA_CONNECTIONS_PER_WORKER
+    if per_worker < 1:
+        raise ValueError(
+            f"Pool budget {budget} is too small for {workers} workers, "
+            f"need at least {workers * (1 + EXTRA_CONNECTIONS_PER_WORKER)}"
+        )
+    return min(2, per_worker), per_worker
+
+
+async def migrate_database():
+    import asyncpg
+
+    from migrations import migrate
+
+    conn = await asyncpg.connect(dsn=os.getenv("DB_URL"))
+    try:
+        await migrate(conn)
+    finally:
+        await conn.close()
+
+
+def serve_worker(app, sock: socket.socket, ready_fd: int) -> bool:
+    """Run uvicorn on the shared socket, writing to `ready_fd` once startup is done.
+
+    Returns whether startup succeeded.
+    """
+    import uvicorn
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+
+    server = Server(
+        uvicorn.Config(app, log_config=None, timeout_graceful_shutdown=WORKER_GRACEFUL_TIMEOUT)
+    )
+    server.run(sockets=[sock])
+    return server.started
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.num_workers = workers
+        # pid -> (spawn time, read end of the worker's readiness pipe)
+        self.workers = {}
+        self.stopping = False
+        self.restart_requested = False
+        self.pending_respawns = 0
+        self.respawn_at = 0.0
+        self.respawn_delay = 0.0
+
+    def spawn(self):
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid:
+            os.close(ready_write)
+            self.workers[pid] = (time.monotonic(), ready_read)
+            return pid
+
+        # Child: drop the master's handlers and serve until told to stop
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        os.close(ready_read)
+        for _, fd in self.workers.values():
+            os.close(fd)
+
+        started = False
+        try:
+            started = serve_worker(self.app, self.sock, ready_write)
+        finally:
+            os._exit(0 if started else 1)
+
+    def forget(self, pid: int):
+        entry = self.workers.pop(pid, None)
+        if entry:
+            os.close(entry[1])
+
+    def wait_ready(self, pid: int) -> bool:
+        """Block until the worker finishes startup; False if it dies or times out first."""
+        _, fd = self.workers[pid]
+        readable, _, _ = select.select([fd], [], [], WORKER_STARTUP_TIMEOUT)
+        # EOF without the ready byte means startup failed and the worker exited
+        return bool(readable) and os.read(fd, 1) == b"1"
+
+    def stop_worker(self, pid: int):
+        """SIGTERM one worker and wait for it to drain, SIGKILL if it won't."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.forget(pid)
+            return
+
+        deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done:
+                break
+            time.sleep(0.1)
+        else:
+            logger.warning(f"Worker {pid} did not exit in time, killing")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.forget(pid)
+
+    def rolling_restart(self):
+        # Start the replacement first and only stop the old worker once the
+        # new one is serving, so even a single worker never leaves the socket
+        # unattended. The pool budget keeps a spare share for the overlap.
+        for pid in list(self.workers):
+            new_pid = self.spawn()
+            if not self.wait_ready(new_pid):
+                logger.error(
+                    f"Replacement worker {new_pid} failed to start, "
+                    f"keeping the remaining old workers"
+                )
+                self.stop_worker(new_pid)
+                return
+            self.stop_worker(pid)
+            logger.info(f"Restarted worker {pid} as {new_pid}")
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid not in self.workers:
+                continue
+            spawned_at, _ = self.workers[pid]
+            self.forget(pid)
+            if self.stopping:
+                continue
+
+            if time.monotonic() - spawned_at < RAPID_EXIT_SECONDS:
+                self.respawn_delay = min(max(self.respawn_delay * 2, 1), MAX_RESPAWN_DELAY)
+            else:
+                self.respawn_delay = 0
+            self.pending_respawns += 1
+            self.respawn_at = time.monotonic() + self.respawn_delay
+            logger.warning(
+                f"Worker {pid} exited ({status}), respawning in {self.respawn_delay:.0f}s"
+            )
+
+    def respawn(self):
+        if self.pending_respawns and time.monotonic() >= self.respawn_at:
+            for _ in range(self.pending_respawns):
+                self.spawn()
+            self.pending_respawns = 0
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        for _ in range(self.num_workers):
+            self.spawn()
+        logger.info(f"Started {self.num_workers} workers: {sorted(self.workers)}")
+
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap()
+            self.respawn()
+            time.sleep(0.5)
+
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        self.sock.close()
+        logger.info("All workers stopped")
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_hup(self, signum, frame):
+        self.restart_requested = True
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--pool-budget",
+        type=int,
+        default=int(os.getenv("DB_POOL_BUDGET", "80")),
+        help="total Postgres connections across all workers",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    min_size, max_size = split_pool_budget(args.pool_budget, args.workers + SURGE_WORKERS)
+    os.environ["DB_POOL_MIN"] = str(min_size)
+    os.environ["DB_POOL_MAX"] = str(max_size)
+    logger.info(
+        f"{args.workers} workers (+{SURGE_WORKERS} during restarts) x {max_size} pooled "
+        f"connections (+{EXTRA_CONNECTIONS_PER_WORKER} listener) within a budget of "
+        f"{args.pool_budget}"
+    )
+
+    # Migrate once here rather than having every worker race for the lock
+    if os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true":
+        asyncio.run(migrate_database())
+        os.environ["MIGRATE_ON_STARTUP"] = "false"
+
+    # Pre-import everything heavy once, before forking
+    import uvicorn  # noqa: F401
+
+    from main import app
+
+    sock = bind_socket(args.host, args.port)
+    Master(app, sock, args.workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -91,7 +91,7 @@ export const studentsApi = {
 
   update: (id: number, data: Partial<Student>) =>
     apiFetch<{ status: string }>(`/students/${id}`, {
-      method: "PUT",
+      method: "PATCH",
       body: JSON.stringify(data),
     }),
 